@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+FULL = "full"
+REDUCED = "reduced"
+INSTANT = "instant"
+
+
+class AnimationPolicy:
+    """Chooses how many animation frames a game may spend, based on how
+    many games are animating right now and how far the event loop is
+    lagging behind. Slots and coinflip share one instance."""
+
+    def __init__(self, reduced_games=10, instant_games=30, reduced_lag=0.05, instant_lag=0.25,
+                 reduced_frames=1, probe_interval=0.5):
+        self.reduced_games = reduced_games
+        self.instant_games = instant_games
+        self.reduced_lag = reduced_lag
+        self.instant_lag = instant_lag
+        self.reduced_frames = reduced_frames
+        self.probe_interval = probe_interval
+        self.active_games = 0
+        self.lag = 0.0
+        self.games_by_tier = {FULL: 0, REDUCED: 0, INSTANT: 0}
+        self._task = None
+
+    def tier(self):
+        if self.active_games >= self.instant_games or self.lag >= self.instant_lag:
+            return INSTANT
+        if self.active_games >= self.reduced_games or self.lag >= self.reduced_lag:
+            return REDUCED
+        return FULL
+
+    def frames(self, sequence):
+        sequence = list(sequence)
+        tier = self.tier()
+        self.games_by_tier[tier] += 1
+        if tier == FULL:
+            return sequence
+        if tier == INSTANT:
+            return []
+        keep = min(self.reduced_frames, len(sequence))
+        return [sequence[i * len(sequence) // keep] for i in range(keep)]
+
+    @contextmanager
+    def playing(self):
+        self.active_games += 1
+        try:
+            yield
+        finally:
+            self.active_games -= 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe_lag())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.probe_interval)
+            lag = max(0.0, loop.time() - started - self.probe_interval)
+            self.lag = 0.7 * self.lag + 0.3 * lag
@@ -0,0 +1,195 @@
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from migrations import migrate
+
+LEDGER_COLUMNS = ("id", "user_id", "game", "kind", "amount", "balance_after", "created_at", "batch_id")
+PENDING_KEY = "ledger_archive_pending"
+
+
+def partition_path(archive_dir, day):
+    return os.path.join(archive_dir, f"ledger-{day}.jsonl.gz")
+
+
+def recover(conn):
+    """Cuts partition files back to their size before a batch whose delete
+    never committed, so re-archiving its rows doesn't duplicate them."""
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (PENDING_KEY,)).fetchone()
+    if row is None:
+        return
+    for path, size in json.loads(row[0]).items():
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(size)
+    with conn:
+        conn.execute("DELETE FROM settings WHERE key = ?", (PENDING_KEY,))
+
+
+def take_batch(conn, archive_dir, cutoff, batch=1000):
+    """The oldest ``batch`` ledger rows created before ``cutoff``, each with
+    its UTC day appended. The partition files they will go to are noted
+    first so recover() can undo a write that never got its delete."""
+    recover(conn)
+    rows = conn.execute(f"SELECT {', '.join(LEDGER_COLUMNS)}, date(created_at, 'unixepoch') FROM ledger ORDER BY id LIMIT ?",
+                        (batch,)).fetchall()
+    for i, row in enumerate(rows):
+        if row[6] >= cutoff:
+            rows = rows[:i]
+            break
+    if rows:
+        paths = {partition_path(archive_dir, row[-1]) for row in rows}
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (PENDING_KEY, json.dumps({
+                path: os.path.getsize(path) if os.path.exists(path) else 0 for path in paths
+            })))
+    return rows
+
+
+def write_batch(archive_dir, rows):
+    """Appends rows from take_batch to their day's gzip JSONL file. Needs no
+    connection, so it can run off the database thread."""
+    days = {}
+    for row in rows:
+        days.setdefault(row[-1], []).append(json.dumps(dict(zip(LEDGER_COLUMNS, row)), ensure_ascii=False))
+    os.makedirs(archive_dir, exist_ok=True)
+    # Each batch is appended as its own gzip member; readers see one stream.
+    for day, lines in days.items():
+        with open(partition_path(archive_dir, day), "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write(("\n".join(lines) + "\n").encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def finish_batch(conn, rows):
+    """Adds the written rows to the per-user daily rollups and deletes them
+    from the ledger."""
+    first, last = rows[0][0], rows[-1][0]
+    with conn:
+        conn.execute("""
+            INSERT INTO ledger_daily (user_id, day, game, kind, entries, amount)
+            SELECT user_id, date(created_at, 'unixepoch'), game, kind, COUNT(*), SUM(amount)
+            FROM ledger WHERE id BETWEEN ? AND ? GROUP BY 1, 2, 3, 4
+            ON CONFLICT(user_id, day, game, kind) DO UPDATE SET
+                entries = entries + excluded.entries,
+                amount = amount + excluded.amount
+        """, (first, last))
+        conn.execute("DELETE FROM ledger WHERE id BETWEEN ? AND ?", (first, last))
+        conn.execute("DELETE FROM settings WHERE key = ?", (PENDING_KEY,))
+
+
+def archive_batch(conn, archive_dir, cutoff, batch=1000):
+    """Moves up to ``batch`` of the oldest ledger rows created before
+    ``cutoff`` into gzip JSONL files, one per UTC day, and into the per-user
+    daily rollups in ledger_daily. Returns how many were moved."""
+    rows = take_batch(conn, archive_dir, cutoff, batch)
+    if rows:
+        write_batch(archive_dir, rows)
+        finish_batch(conn, rows)
+    return len(rows)
+
+
+def archived_days(conn, user_ids, batch=500):
+    days = set()
+    for i in range(0, len(user_ids), batch):
+        chunk = user_ids[i:i + batch]
+        placeholders = ",".join("?" * len(chunk))
+        days.update(row[0] for row in conn.execute(f"SELECT DISTINCT day FROM ledger_daily WHERE user_id IN ({placeholders})", chunk))
+    return sorted(days)
+
+
+def iter_history(conn, archive_dir, user_ids, batch=1000):
+    """Yields the ledger rows of ``user_ids`` as dicts, archived days first
+    and then the live table, holding one batch in memory at a time. The
+    rollups say which day files hold any of the users, so only those are
+    read."""
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    wanted = set(user_ids)
+    for day in archived_days(conn, user_ids):
+        path = partition_path(archive_dir, day)
+        if not os.path.exists(path):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if row["user_id"] in wanted:
+                    yield row
+
+    # Few users go through idx_ledger_user; for a whole guild one pass over
+    # the live table is cheaper than hundreds of IN lists.
+    columns = ", ".join(LEDGER_COLUMNS)
+    few = len(user_ids) <= 500
+    where = f"user_id IN ({','.join('?' * len(user_ids))}) AND " if few else ""
+    after = 0
+    while True:
+        rows = conn.execute(f"SELECT {columns} FROM ledger WHERE {where}id > ? ORDER BY id LIMIT ?",
+                            (*(user_ids if few else ()), after, batch)).fetchall()
+        if not rows:
+            return
+        after = rows[-1][0]
+        for row in rows:
+            if few or row[1] in wanted:
+                yield dict(zip(LEDGER_COLUMNS, row))
+
+
+def export_history(path, archive_dir, user_ids, out):
+    """Writes the history of ``user_ids`` to the binary file ``out`` as
+    gzip JSONL, reading through a read-only connection of its own. Returns
+    the number of rows written."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    written = 0
+    try:
+        with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6) as f:
+            for row in iter_history(conn, archive_dir, user_ids):
+                f.write((json.dumps(row, ensure_ascii=False) + "\n").encode())
+                written += 1
+    finally:
+        conn.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old ledger rows to compressed daily files, or export a user's history")
+    parser.add_argument("--db", default=os.getenv("BANKROLL_DB", "bot_data.db"))
+    parser.add_argument("--archive-dir", default=os.getenv("LEDGER_ARCHIVE_DIR", "ledger_archive"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("archive", help="archive ledger rows older than --keep-days")
+    run.add_argument("--keep-days", type=int, default=int(os.getenv("LEDGER_KEEP_DAYS", "90")))
+    run.add_argument("--batch", type=int, default=1000)
+    export = commands.add_parser("export", help="write the gzip JSONL history of some users to stdout or --out")
+    export.add_argument("user_ids", type=int, nargs="+")
+    export.add_argument("--out")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        out = open(args.out, "wb") if args.out else sys.stdout.buffer
+        try:
+            written = export_history(args.db, args.archive_dir, args.user_ids, out)
+        finally:
+            if args.out:
+                out.close()
+        print(f"Exported {written:,} ledger rows", file=sys.stderr)
+        return
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    cutoff = int(time.time()) - args.keep_days * 86400
+    started = time.perf_counter()
+    archived = 0
+    while True:
+        moved = archive_batch(conn, args.archive_dir, cutoff, args.batch)
+        archived += moved
+        if moved < args.batch:
+            break
+    conn.close()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"Archived {archived:,} ledger rows in {elapsed:.2f}s ({archived / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from storage import STORAGE_PROFILES, Database
+
+
+async def play(db, user_id, spins, bet):
+    for _ in range(spins):
+        if await db.place_wager(user_id, "slots", bet) is None:
+            await db.add_balance(user_id, 1000)
+            continue
+        payout = bet * random.choice([0, 0, 0, 5])
+        await db.settle_wager(user_id, "slots", bet, payout, [["🍒", "🍒", "🍉"]])
+        await asyncio.sleep(0)
+
+
+async def run(write_behind, users, spins, bet):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), write_behind=write_behind)
+        db.migrate()
+        db.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(play(db, user_id, spins, bet) for user_id in range(1, users + 1)))
+        await db.flush()
+        elapsed = time.perf_counter() - start
+        flushes = db.flushes
+        await db.close()
+    games = users * spins
+    label = "write-behind" if write_behind else "direct"
+    print(f"{label:>12}: {games} spins in {elapsed:.2f}s -> {games / elapsed:,.0f} spins/s, {flushes} group commits")
+
+
+async def read_latencies(db, users, stop):
+    samples = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await db.get_profiles([random.randint(1, users)])
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.001)
+    return sorted(samples)
+
+
+async def compare_profile(profile, users, spins, bet):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), write_behind=False, profile=profile)
+        db.migrate()
+        stop = asyncio.Event()
+        reader = asyncio.create_task(read_latencies(db, users, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(play(db, user_id, spins, bet) for user_id in range(1, users + 1)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        reads = await reader
+        await db.close()
+    commits = users * spins * 2
+    p50 = reads[len(reads) // 2] * 1000
+    p99 = reads[int(len(reads) * 0.99)] * 1000
+    print(f"{profile:>8}: {commits / elapsed:>8,.0f} commits/s, profile reads p50 {p50:.2f}ms p99 {p99:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call commits against the write-behind balance cache")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--spins", type=int, default=25)
+    parser.add_argument("--bet", type=int, default=5)
+    parser.add_argument("--profiles", action="store_true", help="compare the SQLite storage profiles with per-call commits")
+    args = parser.parse_args()
+
+    if args.profiles:
+        for profile in STORAGE_PROFILES:
+            asyncio.run(compare_profile(profile, args.users, args.spins, args.bet))
+        return
+
+    asyncio.run(run(False, args.users, args.spins, args.bet))
+    asyncio.run(run(True, args.users, args.spins, args.bet))
+
+
+if __name__ == "__main__":
+    main()
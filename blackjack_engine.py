@@ -0,0 +1,155 @@
+import random
+from array import array
+
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11]
+ACE = 12
+
+WIN = "win"
+PUSH = "push"
+LOSE = "lose"
+PAYOUTS = {WIN: 2, PUSH: 1, LOSE: 0}
+
+
+class Hand:
+    """Cards are rank indexes into RANKS. The total is kept up to date as
+    cards are added, so reading ``value`` never rescans the hand."""
+
+    __slots__ = ("cards", "value", "soft_aces")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.value = 0
+        self.soft_aces = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        self.cards.append(card)
+        self.value += VALUES[card]
+        if card == ACE:
+            self.soft_aces += 1
+        while self.value > 21 and self.soft_aces:
+            self.value -= 10
+            self.soft_aces -= 1
+
+    @property
+    def soft(self):
+        return self.soft_aces > 0
+
+    @property
+    def busted(self):
+        return self.value > 21
+
+    def labels(self):
+        return [RANKS[card] for card in self.cards]
+
+
+class Shoe:
+    """A multi-deck shoe that is reshuffled at the start of the first round
+    after ``penetration`` of it has been dealt."""
+
+    def __init__(self, decks=6, penetration=0.75, rng=None):
+        self.decks = decks
+        self.penetration = penetration
+        self.rng = rng or random.Random()
+        self.cards = array('B', list(range(len(RANKS))) * 4 * decks)
+        self.cut = int(len(self.cards) * penetration)
+        self.position = 0
+        self.shuffles = 0
+        self.shuffle()
+
+    def shuffle(self):
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        self.shuffles += 1
+
+    def start_round(self):
+        if self.position >= self.cut:
+            self.shuffle()
+
+    def draw(self):
+        if self.position >= len(self.cards):
+            self.shuffle()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+
+def deal(shoe):
+    shoe.start_round()
+    player = Hand()
+    dealer = Hand()
+    player.add(shoe.draw())
+    player.add(shoe.draw())
+    dealer.add(shoe.draw())
+    dealer.add(shoe.draw())
+    return player, dealer
+
+
+def dealer_play(dealer, shoe):
+    while dealer.value < 17:
+        dealer.add(shoe.draw())
+
+
+def settle(player, dealer):
+    if player.busted:
+        return LOSE
+    if dealer.busted or player.value > dealer.value:
+        return WIN
+    if player.value == dealer.value:
+        return PUSH
+    return LOSE
+
+
+def _hard_strategy():
+    table = [[True] * 12 for _ in range(32)]
+    for total in range(32):
+        for up in range(2, 12):
+            if total >= 17:
+                hit = False
+            elif total >= 13:
+                hit = up >= 7
+            elif total == 12:
+                hit = not 4 <= up <= 6
+            else:
+                hit = True
+            table[total][up] = hit
+    return table
+
+
+def _soft_strategy():
+    table = [[True] * 12 for _ in range(32)]
+    for total in range(32):
+        for up in range(2, 12):
+            if total >= 19:
+                hit = False
+            elif total == 18:
+                hit = up >= 9
+            else:
+                hit = True
+            table[total][up] = hit
+    return table
+
+
+HARD_HIT = _hard_strategy()
+SOFT_HIT = _soft_strategy()
+
+
+def basic_strategy_hits(player, dealer_up):
+    """Hit/stand basic strategy. The bot offers no double, split or
+    surrender, so only that part of the chart applies."""
+    up = VALUES[dealer_up]
+    if player.soft:
+        return SOFT_HIT[player.value][up]
+    return HARD_HIT[player.value][up]
+
+
+def play_hand(shoe):
+    player, dealer = deal(shoe)
+    up = dealer.cards[0]
+    while not player.busted and basic_strategy_hits(player, up):
+        player.add(shoe.draw())
+    if not player.busted:
+        dealer_play(dealer, shoe)
+    return settle(player, dealer)
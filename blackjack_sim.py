@@ -0,0 +1,64 @@
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from blackjack_engine import LOSE, PAYOUTS, PUSH, WIN, Shoe, play_hand
+
+
+def simulate(hands, decks, penetration, seed):
+    shoe = Shoe(decks, penetration, random.Random(seed))
+    counts = {WIN: 0, PUSH: 0, LOSE: 0}
+    for _ in range(hands):
+        counts[play_hand(shoe)] += 1
+    return counts, shoe.shuffles
+
+
+def run(hands, decks, penetration, workers, seed):
+    chunks = max(1, workers)
+    sizes = [hands // chunks + (1 if i < hands % chunks else 0) for i in range(chunks)]
+    seeds = [random.Random(seed).getrandbits(64) + i for i in range(chunks)]
+    started = time.perf_counter()
+    if chunks == 1:
+        results = [simulate(sizes[0], decks, penetration, seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=chunks) as pool:
+            results = list(pool.map(simulate, sizes, [decks] * chunks, [penetration] * chunks, seeds))
+    elapsed = time.perf_counter() - started
+
+    counts = {WIN: 0, PUSH: 0, LOSE: 0}
+    shuffles = 0
+    for result, shoe_shuffles in results:
+        for outcome, count in result.items():
+            counts[outcome] += count
+        shuffles += shoe_shuffles
+    return counts, shuffles, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate blackjack hands under basic strategy to measure the house edge")
+    parser.add_argument("--hands", type=int, default=2_000_000)
+    parser.add_argument("--decks", type=int, default=6)
+    parser.add_argument("--penetration", type=float, default=0.75)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    counts, shuffles, elapsed = run(args.hands, args.decks, args.penetration, args.workers, args.seed)
+    n = sum(counts.values())
+    # Net result per hand in bets: +1 win, 0 push, -1 loss.
+    mean = (counts[WIN] - counts[LOSE]) / n
+    variance = (counts[WIN] + counts[LOSE]) / n - mean * mean
+    ci = 1.96 * math.sqrt(variance / n)
+
+    print(f"{n:,} hands, {args.decks} decks, {args.penetration:.0%} penetration, {shuffles:,} shuffles")
+    print(f"{elapsed:.2f}s over {args.workers} worker(s): {n / elapsed:,.0f} hands/s")
+    for outcome in (WIN, PUSH, LOSE):
+        print(f"  {outcome:<5} {counts[outcome] / n:.4%} (pays {PAYOUTS[outcome]}x)")
+    print(f"House edge: {-mean:.4%} ± {ci:.4%}")
+
+
+if __name__ == "__main__":
+    main()
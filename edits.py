@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class _Frame:
+    __slots__ = ("message", "fields", "droppable", "waiters")
+
+    def __init__(self, message, fields, droppable):
+        self.message = message
+        self.fields = fields
+        self.droppable = droppable
+        self.waiters = []
+
+
+def _channel_id(message):
+    channel = getattr(message, "channel", None)
+    return getattr(channel, "id", None) or getattr(message, "channel_id", None)
+
+
+class EditScheduler:
+    """Funnels every animation ``message.edit`` through a per-channel
+    sliding window: at most ``rate`` edits are sent in any ``per`` seconds,
+    which is the channel limit itself, so frames are dropped here rather
+    than queued behind 429s.
+
+    Only one frame is ever pending per message: a newer frame is merged into
+    the pending one, so only the latest content is sent. ``submit`` is for
+    intermediate animation frames and drops them outright when the channel
+    has no budget left. ``edit`` is for frames that must land, such as the
+    final result or a view change. It waits until that frame (or a newer one
+    merged into it) has been sent.
+    """
+
+    def __init__(self, rate=5, per=5.0, max_channels=10_000):
+        self.rate = rate
+        self.per = per
+        self.max_channels = max_channels
+        self._windows = {}
+        self._pending = {}
+        self._workers = {}
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.rate_limited = 0
+
+    @property
+    def queue_depth(self):
+        return sum(len(pending) for pending in self._pending.values())
+
+    def stats(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "rate_limited": self.rate_limited,
+            "queue_depth": self.queue_depth,
+        }
+
+    def _window(self, channel_id):
+        """Send times of the channel's edits within the last ``per`` seconds."""
+        now = time.monotonic()
+        window = self._windows.get(channel_id)
+        if window is None:
+            if len(self._windows) >= self.max_channels:
+                self._prune()
+            window = self._windows[channel_id] = deque()
+        while window and now - window[0] >= self.per:
+            window.popleft()
+        return window
+
+    def _prune(self):
+        for channel_id in [c for c in self._windows if c not in self._pending]:
+            del self._windows[channel_id]
+
+    def _take(self, channel_id):
+        window = self._window(channel_id)
+        if len(window) < self.rate:
+            window.append(time.monotonic())
+            return 0
+        return window[0] + self.per - time.monotonic()
+
+    def note_rate_limited(self):
+        """Counts a 429 on a message edit. discord.py retries those itself,
+        so they are seen through the HTTP trace rather than as errors."""
+        self.rate_limited += 1
+
+    def _enqueue(self, message, fields, droppable):
+        channel_id = _channel_id(message)
+        pending = self._pending.get(channel_id)
+        frame = pending.get(message.id) if pending else None
+
+        if frame is not None:
+            frame.fields.update(fields)
+            frame.droppable = frame.droppable and droppable
+            self.frames_dropped += 1
+        else:
+            queued = len(pending) if pending else 0
+            if droppable and self.rate - len(self._window(channel_id)) - queued < 1:
+                self.frames_dropped += 1
+                return None
+            frame = _Frame(message, dict(fields), droppable)
+            self._pending.setdefault(channel_id, OrderedDict())[message.id] = frame
+
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+        return frame
+
+    def submit(self, message, **fields):
+        return self._enqueue(message, fields, droppable=True) is not None
+
+    async def edit(self, message, **fields):
+        frame = self._enqueue(message, fields, droppable=False)
+        waiter = asyncio.get_running_loop().create_future()
+        frame.waiters.append(waiter)
+        return await waiter
+
+    async def _drain(self, channel_id):
+        pending = self._pending[channel_id]
+        try:
+            while pending:
+                wait = self._take(channel_id)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                _, frame = pending.popitem(last=False)
+                try:
+                    result = await frame.message.edit(**frame.fields)
+                except asyncio.CancelledError:
+                    for waiter in frame.waiters:
+                        waiter.cancel()
+                    raise
+                except Exception as e:
+                    # Anything the edit raises goes to its waiters; the
+                    # worker keeps draining the channel either way.
+                    if not frame.waiters:
+                        if isinstance(e, discord.HTTPException):
+                            log.debug("Dropped animation frame after edit failed: %s", e)
+                        else:
+                            log.warning("Dropped animation frame after edit failed", exc_info=e)
+                    for waiter in frame.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    self.frames_sent += 1
+                    for waiter in frame.waiters:
+                        if not waiter.done():
+                            waiter.set_result(result)
+        finally:
+            del self._workers[channel_id]
+            # Only cancellation gets here with frames left; fail their
+            # waiters rather than leave them waiting on a dead worker.
+            for frame in pending.values():
+                for waiter in frame.waiters:
+                    waiter.cancel()
+            pending.clear()
+            self._pending.pop(channel_id, None)
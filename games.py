@@ -0,0 +1,105 @@
+import json
+import time
+import uuid
+from collections import OrderedDict
+
+from blackjack_engine import Hand
+
+
+def new_game_id():
+    return uuid.uuid4().hex[:12]
+
+
+class SlotGame:
+    kind = "slots"
+
+    def __init__(self, game_id, user_id, bet, machine="classic", channel_id=None, message_id=None):
+        self.game_id = game_id
+        self.user_id = user_id
+        self.bet = bet
+        self.machine = machine
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.view = None
+
+    def state(self):
+        return {"bet": self.bet, "machine": self.machine}
+
+
+class BlackjackGame:
+    kind = "blackjack"
+
+    def __init__(self, game_id, user_id, bet, player, dealer, channel_id=None, message_id=None):
+        self.game_id = game_id
+        self.user_id = user_id
+        self.bet = bet
+        self.player = player
+        self.dealer = dealer
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.view = None
+
+    def state(self):
+        return {"bet": self.bet, "player": self.player.cards, "dealer": self.dealer.cards}
+
+
+def game_to_row(game):
+    return (game.game_id, game.kind, game.user_id, json.dumps(game.state()), game.channel_id, game.message_id)
+
+
+def game_from_row(game_id, kind, user_id, state, channel_id, message_id):
+    state = json.loads(state)
+    if kind == SlotGame.kind:
+        return SlotGame(game_id, user_id, state["bet"], state["machine"], channel_id, message_id)
+    if kind == BlackjackGame.kind:
+        return BlackjackGame(game_id, user_id, state["bet"], Hand(state["player"]), Hand(state["dealer"]), channel_id, message_id)
+    raise ValueError(f"Unknown game kind {kind!r}")
+
+
+class GameRegistry:
+    """Active games by id. Each lookup pushes a game's expiry ``ttl``
+    seconds out. ``expire`` pops games that have gone idle, plus the least
+    recently used ones once more than ``max_size`` are active."""
+
+    def __init__(self, ttl=120, max_size=10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._games = OrderedDict()
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id):
+        return game_id in self._games
+
+    def values(self):
+        return [game for game, _ in self._games.values()]
+
+    def add(self, game, expires_at=None):
+        self._games[game.game_id] = (game, expires_at or time.time() + self.ttl)
+        self._games.move_to_end(game.game_id)
+
+    def get(self, game_id):
+        entry = self._games.get(game_id)
+        if entry is None:
+            return None
+        self.add(entry[0])
+        return entry[0]
+
+    def expires_at(self, game_id):
+        entry = self._games.get(game_id)
+        return entry[1] if entry else None
+
+    def pop(self, game_id):
+        entry = self._games.pop(game_id, None)
+        return entry[0] if entry else None
+
+    def expire(self, now=None):
+        now = now or time.time()
+        expired = []
+        for game_id, (game, expires_at) in list(self._games.items()):
+            if expires_at > now and len(self._games) <= self.max_size:
+                break
+            del self._games[game_id]
+            expired.append(game)
+        return expired
@@ -0,0 +1,280 @@
+import argparse
+import io
+import json
+import os
+import re
+import time
+
+from migrations import migrate
+from storage import STARTING_BALANCE, connect, get_setting
+
+CURRENCY_FILE = "currency_data.json"
+STATS_FILE = "stats_data.json"
+LEGACY_DB = "currency.db"
+DB_FILE = "bot_data.db"
+
+STATS_COLUMNS = ("games_played", "wins", "losses", "total_earned", "largest_win")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_SEPARATORS = re.compile(r"[\s,]*")
+_NUMBER_CHARS = re.compile(r"[0-9.eE+-]*")
+
+
+def _member(buf, pos, eof):
+    """Parses the ``"key": value`` member at ``pos``. Returns None when the
+    buffer ends before the member does."""
+    try:
+        key, pos = _decoder.raw_decode(buf, pos)
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            return None
+        if not isinstance(key, str) or buf[pos] != ":":
+            raise ValueError(f"Expected a \"key\": value member at {buf[pos:pos + 20]!r}")
+        value, end = _decoder.raw_decode(buf, _WHITESPACE.match(buf, pos + 1).end())
+    except json.JSONDecodeError:
+        return None
+    # A number cut off by the chunk boundary, at a digit or at its "." or
+    # "e", decodes as a shorter number; only trust it once something else
+    # follows it.
+    if not eof and isinstance(value, (int, float)) and _NUMBER_CHARS.match(buf, end).end() == len(buf):
+        return None
+    return key, value, end
+
+
+def iter_members(path, offset=0, chunk_size=1 << 16):
+    """Yields (key, value, offset) for each member of the top-level JSON
+    object in ``path``, reading it a chunk at a time. ``offset`` is the byte
+    position just past the member, so passing it back in resumes there."""
+    # Any saved offset is past the opening brace.
+    inside = offset > 0
+    with open(path, "rb") as raw:
+        if not inside and raw.read(3) == b"\xef\xbb\xbf":
+            offset = 3
+        raw.seek(offset)
+        text = io.TextIOWrapper(raw, encoding="utf-8")
+        buf, pos, eof = "", 0, False
+        while True:
+            start = _SEPARATORS.match(buf, pos).end()
+            if start == len(buf) and not eof:
+                chunk = text.read(chunk_size)
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+                continue
+            if not inside:
+                if start == len(buf) or buf[start] != "{":
+                    raise ValueError(f"{path} does not hold a JSON object")
+                offset += len(buf[pos:start + 1].encode())
+                pos, inside = start + 1, True
+                continue
+            if start == len(buf):
+                raise ValueError(f"{path} ends before its closing brace")
+            if buf[start] == "}":
+                return
+            member = _member(buf, start, eof)
+            if member is None:
+                if eof:
+                    raise ValueError(f"Malformed JSON in {path} after byte {offset}")
+                chunk = text.read(chunk_size)
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+                continue
+            key, value, end = member
+            offset += len(buf[pos:end].encode())
+            pos = end
+            yield key, value, offset
+
+
+def symbol_counts(value):
+    """The old bot stored either a JSON object of counts or just the last
+    spin's most common symbol; a lone symbol is kept as a count of one."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value.startswith("{") else {value: 1} if value else {}
+        except ValueError:
+            value = {}
+    if not isinstance(value, dict):
+        return "{}"
+    return json.dumps({str(symbol): int(count) for symbol, count in value.items() if isinstance(count, (int, float))})
+
+
+def currency_row(user_id, value):
+    if isinstance(value, dict):
+        value = value.get("balance", STARTING_BALANCE)
+    return int(user_id), int(value)
+
+
+def stats_row(user_id, stats):
+    return (int(user_id), *(int(stats.get(column) or 0) for column in STATS_COLUMNS), symbol_counts(stats.get("most_common_symbol")))
+
+
+def json_batches(convert):
+    def batches(conn, path, position, size):
+        rows, skipped = [], 0
+        for key, value, position in iter_members(path, position):
+            try:
+                rows.append(convert(key, value))
+            except (AttributeError, TypeError, ValueError):
+                skipped += 1
+            if len(rows) + skipped >= size:
+                yield rows, position, skipped
+                rows, skipped = [], 0
+        if rows or skipped:
+            yield rows, position, skipped
+    return batches
+
+
+def legacy_batches(query, convert=None):
+    def batches(conn, path, position, size):
+        while True:
+            rows = conn.execute(query, (position, size)).fetchall()
+            if not rows:
+                return
+            position = rows[-1][0]
+            yield ([convert(row) for row in rows] if convert else rows), position, 0
+    return batches
+
+
+def stage_currency(conn, rows):
+    conn.executemany("INSERT OR REPLACE INTO temp.import_currency (user_id, balance) VALUES (?, ?)", rows)
+
+
+def stage_stats(conn, rows):
+    conn.executemany("""
+        INSERT OR REPLACE INTO temp.import_stats (user_id, games_played, wins, losses, total_earned, largest_win, symbols)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def merge_currency(conn, replace):
+    """Upserts the staged balances, with an "import" ledger row for every
+    balance that changes. Without ``replace`` users already in the database
+    are left alone."""
+    conn.execute(f"""
+        INSERT INTO ledger (user_id, game, kind, amount, balance_after, created_at)
+        SELECT i.user_id, 'import', 'balance', i.balance - COALESCE(c.balance, ?), i.balance, ?
+        FROM temp.import_currency i LEFT JOIN currency c ON c.user_id = i.user_id
+        WHERE {"" if replace else "c.user_id IS NULL AND "}i.balance != COALESCE(c.balance, ?)
+    """, (STARTING_BALANCE, int(time.time()), STARTING_BALANCE))
+    written = conn.execute(f"""
+        INSERT INTO currency (user_id, balance) SELECT user_id, balance FROM temp.import_currency WHERE true
+        ON CONFLICT(user_id) DO {"UPDATE SET balance = excluded.balance" if replace else "NOTHING"}
+    """).rowcount
+    conn.execute("DELETE FROM temp.import_currency")
+    return written
+
+
+def merge_stats(conn, replace):
+    if replace:
+        conn.execute("DELETE FROM symbol_counts WHERE user_id IN (SELECT user_id FROM temp.import_stats)")
+    else:
+        conn.execute("DELETE FROM temp.import_stats WHERE user_id IN (SELECT user_id FROM stats)")
+    written = conn.execute("""
+        INSERT INTO stats (user_id, games_played, wins, losses, total_earned, largest_win)
+        SELECT user_id, games_played, wins, losses, total_earned, largest_win FROM temp.import_stats WHERE true
+        ON CONFLICT(user_id) DO UPDATE SET
+            games_played = excluded.games_played,
+            wins = excluded.wins,
+            losses = excluded.losses,
+            total_earned = excluded.total_earned,
+            largest_win = excluded.largest_win
+    """).rowcount
+    conn.execute("""
+        INSERT INTO symbol_counts (user_id, symbol, count)
+        SELECT s.user_id, j.key, j.value FROM temp.import_stats s, json_each(s.symbols) j WHERE j.value > 0
+        ON CONFLICT(user_id, symbol) DO NOTHING
+    """)
+    conn.execute("DELETE FROM temp.import_stats")
+    return written
+
+
+def import_source(conn, name, path, batches, stage, merge, replace, batch_size):
+    """Imports one source a batch per transaction. Where it got to is saved
+    in the settings table by the same transaction, so an interrupted run
+    picks up after the last committed batch."""
+    stat = os.stat(path)
+    fingerprint = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+    key = f"import:{name}"
+    saved = get_setting(conn, key)
+    progress = json.loads(saved) if saved else None
+    if progress is None or progress["fingerprint"] != fingerprint:
+        progress = {"fingerprint": fingerprint, "position": 0, "rows": 0, "skipped": 0, "done": False}
+    if progress["done"]:
+        print(f"{name}: already imported ({progress['rows']:,} rows)")
+        return
+    if progress["position"]:
+        print(f"{name}: resuming after {progress['rows']:,} rows")
+
+    started = last_report = time.perf_counter()
+    rows = written = 0
+    for chunk, position, skipped in batches(conn, path, progress["position"], batch_size):
+        with conn:
+            stage(conn, chunk)
+            written += merge(conn, replace)
+            progress.update(position=position, rows=progress["rows"] + len(chunk), skipped=progress["skipped"] + skipped)
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(progress)))
+        rows += len(chunk)
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            print(f"{name}: {rows:,} rows, {rows / (now - started):,.0f} rows/s")
+            last_report = now
+
+    progress["done"] = True
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(progress)))
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"{name}: {rows:,} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s), {written:,} written, "
+          f"{progress['skipped']:,} malformed entries skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the old JSON files and currency.db into the bot database. "
+                                                 "Run it while the bot is stopped; rerun it to resume an interrupted import.")
+    parser.add_argument("--db", default=os.getenv("BANKROLL_DB", DB_FILE))
+    parser.add_argument("--currency", default=CURRENCY_FILE)
+    parser.add_argument("--stats", default=STATS_FILE)
+    parser.add_argument("--legacy-db", default=LEGACY_DB)
+    parser.add_argument("--batch", type=int, default=5_000)
+    parser.add_argument("--replace", action="store_true",
+                        help="let imported values overwrite users already in the database instead of skipping them")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    migrate(conn)
+    conn.execute("CREATE TEMP TABLE import_currency (user_id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)")
+    conn.execute("""CREATE TEMP TABLE import_stats (
+        user_id INTEGER PRIMARY KEY,
+        games_played INTEGER, wins INTEGER, losses INTEGER, total_earned INTEGER, largest_win INTEGER,
+        symbols TEXT NOT NULL
+    )""")
+
+    sources = [
+        ("currency_json", args.currency, json_batches(currency_row), stage_currency, merge_currency),
+        ("stats_json", args.stats, json_batches(stats_row), stage_stats, merge_stats),
+    ]
+    if os.path.exists(args.legacy_db):
+        conn.execute("ATTACH DATABASE ? AS legacy", (args.legacy_db,))
+        tables = {row[0] for row in conn.execute("SELECT name FROM legacy.sqlite_master WHERE type = 'table'")}
+        if "currency" in tables:
+            sources.append(("legacy_currency", args.legacy_db, legacy_batches(
+                "SELECT user_id, balance FROM legacy.currency WHERE user_id > ? ORDER BY user_id LIMIT ?"
+            ), stage_currency, merge_currency))
+        if "stats" in tables:
+            sources.append(("legacy_stats", args.legacy_db, legacy_batches(
+                "SELECT user_id, games_played, wins, losses, total_earned, largest_win, most_common_symbol "
+                "FROM legacy.stats WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                lambda row: (*row[:6], symbol_counts(row[6])),
+            ), stage_stats, merge_stats))
+    # currency.db replaced the JSON files, so its values are newer. Without
+    # --replace the first source to write a user wins; with it, the last.
+    if not args.replace:
+        sources.reverse()
+
+    for name, path, batches, stage, merge in sources:
+        if not os.path.exists(path):
+            print(f"{name}: {path} not found, skipping")
+            continue
+        import_source(conn, name, path, batches, stage, merge, args.replace, args.batch)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class UserNameCache:
+    """TTL cache of display names. Hits come from memory, then from the
+    gateway user cache, and anything left is fetched over REST concurrently."""
+
+    def __init__(self, ttl=600, max_size=10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._names = OrderedDict()
+
+    def _store(self, user_id, name, now):
+        self._names[user_id] = (name, now + self.ttl)
+        self._names.move_to_end(user_id)
+        while len(self._names) > self.max_size:
+            self._names.popitem(last=False)
+
+    async def resolve(self, client, user_ids):
+        now = time.monotonic()
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            entry = self._names.get(user_id)
+            if entry is not None and entry[1] > now:
+                names[user_id] = entry[0]
+                continue
+            user = client.get_user(user_id)
+            if user is not None:
+                names[user_id] = user.name
+                self._store(user_id, user.name, now)
+            else:
+                missing.append(user_id)
+
+        if missing:
+            results = await asyncio.gather(*(client.fetch_user(user_id) for user_id in missing), return_exceptions=True)
+            for user_id, result in zip(missing, results):
+                if isinstance(result, discord.NotFound):
+                    names[user_id] = None
+                    self._store(user_id, None, now)
+                elif isinstance(result, Exception):
+                    log.warning("Could not fetch user %s: %s", user_id, result)
+                    names[user_id] = None
+                else:
+                    names[user_id] = result.name
+                    self._store(user_id, result.name, now)
+        return names
+
+
+class LeaderboardSnapshot:
+    """Top-N balances refreshed in the background, so /leaderboard never
+    queries the database on the request path."""
+
+    def __init__(self, db, size=25, refresh_interval=30):
+        self.db = db
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.rows = []
+        self.refreshed_at = None
+        self._task = None
+
+    async def refresh(self):
+        self.rows = [(int(user_id), balance) for user_id, balance in await self.db.top_balances(self.size)]
+        self.refreshed_at = time.monotonic()
+
+    async def top(self, limit):
+        if self.refreshed_at is None:
+            await self.refresh()
+        return self.rows[:limit]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("Leaderboard refresh failed")
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+import discord
+
+# main reads these at import time, so they must be set first.
+_tmp = tempfile.TemporaryDirectory()
+os.environ["BANKROLL_DB"] = os.path.join(_tmp.name, "loadtest.db")
+os.environ["METRICS_PORT"] = "0"
+
+import main  # noqa: E402
+from storage import STARTING_BALANCE  # noqa: E402
+
+
+class FakeREST:
+    """Stands in for Discord's REST API: every call sleeps for a jittered
+    latency, and message edits share a per-channel window of ``edit_rate``
+    per ``edit_per`` seconds. An edit over the limit counts as a 429 and
+    waits for the window, the way discord.py retries it transparently."""
+
+    def __init__(self, latency, jitter, edit_rate=5, edit_per=5.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.edit_rate = edit_rate
+        self.edit_per = edit_per
+        self.calls = {}
+        self.rate_limited = 0
+        self._edits = {}
+        self._next_id = 1
+
+    def new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    async def call(self, kind):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    async def edit(self, channel_id):
+        while True:
+            now = time.monotonic()
+            recent = [t for t in self._edits.get(channel_id, ()) if now - t < self.edit_per]
+            self._edits[channel_id] = recent
+            if len(recent) < self.edit_rate:
+                break
+            self.rate_limited += 1
+            await asyncio.sleep(recent[0] + self.edit_per - now)
+        recent.append(now)
+        await self.call("message.edit")
+
+
+class FakeMessage:
+    def __init__(self, rest, channel_id, content=None, embed=None, view=None):
+        self.rest = rest
+        self.id = rest.new_id()
+        self.channel = SimpleNamespace(id=channel_id)
+        self.content = content
+        self.embed = embed
+        self.view = view
+
+    def update(self, content=None, embed=None, view=None, **_):
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+        if view is not None:
+            self.view = view
+
+    async def edit(self, **fields):
+        await self.rest.edit(self.channel.id)
+        self.update(**fields)
+        return self
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    def _respond(self):
+        if self._done:
+            raise discord.InteractionResponded(self.interaction)
+        self._done = True
+
+    async def defer(self, **_):
+        self._respond()
+        await self.interaction.rest.call("interaction.defer")
+
+    async def send_message(self, content=None, *, embed=None, view=None, ephemeral=False, **_):
+        self._respond()
+        await self.interaction.rest.call("interaction.send_message")
+        self.interaction.original = self.interaction.new_message(content, embed, view)
+
+    async def edit_message(self, **fields):
+        self._respond()
+        await self.interaction.rest.call("interaction.edit_message")
+        self.interaction.message.update(**fields)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, *, embed=None, view=None, ephemeral=False, **_):
+        await self.interaction.rest.call("followup.send")
+        return self.interaction.new_message(content, embed, view)
+
+
+class FakeInteraction:
+    def __init__(self, rest, user, guild_id, channel_id, message=None):
+        self.rest = rest
+        self.user = user
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message = message
+        self.command = None
+        self.original = None
+        self.sent = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    def new_message(self, content, embed, view):
+        message = FakeMessage(self.rest, self.channel_id, content, embed, view)
+        self.sent.append(message)
+        return message
+
+    async def original_response(self):
+        await self.rest.call("interaction.original_response")
+        return self.original
+
+    def latest_view(self):
+        for message in reversed(self.sent):
+            if message.view is not None:
+                return message
+        return None
+
+
+class SimulatedUser:
+    def __init__(self, harness, user_id):
+        self.harness = harness
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.guild_id = harness.guild_for(user_id)
+        self.channel_id = harness.channel_for(user_id)
+        self.display_avatar = SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+
+    def interaction(self, message=None):
+        return FakeInteraction(self.harness.rest, self, self.guild_id, self.channel_id, message)
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.rest = FakeREST(args.latency, args.jitter)
+        self.latencies = {}
+        self.errors = {}
+        self.rejected = 0
+        self.actions = 0
+        self.users = [SimulatedUser(self, user_id) for user_id in range(1, args.users + 1)]
+
+    def guild_for(self, user_id):
+        return 1000 + user_id % self.args.guilds
+
+    def channel_for(self, user_id):
+        return 2000 + user_id % self.args.channels
+
+    def record(self, name, started):
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        self.actions += 1
+
+    async def command(self, name, interaction, **params):
+        command = main.client.tree.get_command(name)
+        interaction.command = command
+        started = time.perf_counter()
+        try:
+            for check in command.checks:
+                await discord.utils.maybe_coroutine(check, interaction)
+            await command.callback(interaction, **params)
+        except discord.app_commands.CommandOnCooldown as e:
+            self.rejected += 1
+            await main.on_app_command_error(interaction, e)
+        except Exception as e:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            if self.args.verbose:
+                logging.exception("%s failed: %s", name, e)
+        self.record(f"/{name}", started)
+
+    async def click(self, user, message, name):
+        view = message.view
+        item = next(item for item in view.children if getattr(item.callback, "callback", None) and item.callback.callback.__name__ == name)
+        interaction = user.interaction(message)
+        started = time.perf_counter()
+        try:
+            if await view.interaction_check(interaction):
+                await item.callback(interaction)
+        except Exception as e:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            if self.args.verbose:
+                logging.exception("%s failed: %s", name, e)
+        self.record(f"button {name}", started)
+
+    async def play_slots(self, user):
+        interaction = user.interaction()
+        await self.command("slots", interaction, bet=random.randint(1, 10), machine=random.choice(list(main.MACHINES)))
+        message = interaction.latest_view()
+        if message is None:
+            return
+        for _ in range(random.randint(0, 3)):
+            if random.random() < self.args.double_click:
+                await asyncio.gather(self.click(user, message, "spin_again"), self.click(user, message, "spin_again"))
+            else:
+                await self.click(user, message, "spin_again")
+        await self.click(user, message, "stop_game")
+
+    async def play_blackjack(self, user):
+        interaction = user.interaction()
+        await self.command("blackjack", interaction, bet=random.randint(1, 10))
+        message = interaction.latest_view()
+        if message is None:
+            return
+        game = message.view.game
+        while game.game_id in main.client.games and game.player.value < 17:
+            await self.click(user, message, "hit")
+        if game.game_id in main.client.games:
+            await self.click(user, message, "stand")
+
+    async def play_leaderboard(self, user):
+        interaction = user.interaction()
+        await self.command("leaderboard", interaction)
+        if interaction.original is not None and interaction.original.view is not None:
+            await self.click(user, interaction.original, "next_page")
+
+    async def play(self, user, deadline):
+        actions = [
+            (40, self.play_slots),
+            (20, self.play_blackjack),
+            (15, lambda u: self.command("coinflip", u.interaction(), guess=random.choice(["heads", "tails"]), bet=random.randint(1, 10))),
+            (10, lambda u: self.command("balance", u.interaction())),
+            (6, lambda u: self.command("profile", u.interaction())),
+            (5, self.play_leaderboard),
+            (4, lambda u: self.command("daily_reward", u.interaction())),
+        ]
+        weights = [weight for weight, _ in actions]
+        await asyncio.sleep(random.random() * self.args.ramp)
+        while time.monotonic() < deadline:
+            _, action = random.choices(actions, weights)[0]
+            await action(user)
+            await asyncio.sleep(random.expovariate(1 / self.args.think) if self.args.think else 0)
+
+    async def fetch_user(self, user_id):
+        await self.rest.call("fetch_user")
+        return SimpleNamespace(id=user_id, name=f"user{user_id}")
+
+    async def run(self):
+        db = main.db
+        db.migrate()
+        db.start()
+        main.top_players.start()
+        main.animation.start()
+        main.client.fetch_user = self.fetch_user
+        if not self.args.cooldowns:
+            main.limiter.rate = main.limiter.guild_rate = 10 ** 9
+        changes_before = db.run_sync(lambda conn: conn.total_changes)
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.args.duration
+        await asyncio.gather(*(self.play(user, deadline) for user in self.users))
+        elapsed = time.perf_counter() - started
+
+        await db.flush()
+        changes = db.run_sync(lambda conn: conn.total_changes) - changes_before
+        violations = await self.check_balances()
+        main.top_players.stop()
+        main.animation.stop()
+        await db.close()
+        self.report(elapsed, changes, violations)
+
+    async def check_balances(self):
+        rows = main.db.run_sync(lambda conn: conn.execute("""
+            SELECT c.user_id, c.balance, COALESCE(SUM(l.amount), 0)
+            FROM currency c LEFT JOIN ledger l ON l.user_id = c.user_id
+            GROUP BY c.user_id
+        """).fetchall())
+        violations = []
+        for user_id, balance, ledger_total in rows:
+            expected = STARTING_BALANCE + ledger_total
+            if balance < 0 or balance != expected:
+                violations.append((user_id, balance, expected))
+        return violations
+
+    def report(self, elapsed, changes, violations):
+        total = sum(len(samples) for samples in self.latencies.values())
+        print(f"{self.args.users} users, {self.args.guilds} guild(s), {self.args.channels} channel(s), {elapsed:.1f}s")
+        print(f"{total:,} actions -> {total / elapsed:,.1f}/s ({self.rejected} refused by cooldowns)")
+        print(f"{'action':<22}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, samples in sorted(self.latencies.items()):
+            samples.sort()
+            p50 = samples[len(samples) // 2]
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            print(f"{name:<22}{len(samples):>8}{p50 * 1000:>10.1f}{p99 * 1000:>10.1f}{samples[-1] * 1000:>10.1f}")
+        print(f"REST calls: {sum(self.rest.calls.values()):,} {dict(sorted(self.rest.calls.items()))}, 429s: {self.rest.rate_limited}")
+        print(f"Edit scheduler: {main.edits.stats()}")
+        print(f"Animation tiers: {main.animation.games_by_tier}, busy clicks refused: {main.game_locks.contended}")
+        print(f"DB: {changes:,} rows written in {main.db.flushes} group commits")
+        if self.errors:
+            print(f"Handler errors: {self.errors}")
+        print(f"Balance invariant violations: {len(violations)}")
+        for user_id, balance, expected in violations[:10]:
+            print(f"  user {user_id}: balance {balance}, ledger says {expected}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive simulated users through the real command and button handlers, offline")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic after the ramp-up starts")
+    parser.add_argument("--ramp", type=float, default=5.0, help="spread user start times over this many seconds")
+    parser.add_argument("--think", type=float, default=1.0, help="mean pause between a user's actions, in seconds")
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--channels", type=int, default=None, help="defaults to one channel per user")
+    parser.add_argument("--latency", type=float, default=0.08, help="mean simulated REST latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.03)
+    parser.add_argument("--double-click", type=float, default=0.05, help="chance a spin is clicked twice at once")
+    parser.add_argument("--cooldowns", action="store_true", help="keep the per-user and per-guild rate limits on")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    args.channels = args.channels or args.users
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    random.seed(arguments.seed)
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        asyncio.run(Harness(arguments).run())
+    finally:
+        _tmp.cleanup()
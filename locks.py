@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+
+
+class UserLocks:
+    """Lets each user have one game action in flight at a time, shared by
+    every game. Only users holding a claim are tracked, so memory follows
+    the number of concurrent players rather than everyone who ever played.
+
+    Nothing waits on a claim: a second click while one is held is refused
+    straight away, so it costs no database work."""
+
+    def __init__(self):
+        self._busy = set()
+        self.claimed = 0
+        self.contended = 0
+
+    def __len__(self):
+        return len(self._busy)
+
+    def busy(self, user_id):
+        return user_id in self._busy
+
+    @contextmanager
+    def claim(self, user_id):
+        """Yields True while holding the user's claim, or False at once if
+        someone else already holds it."""
+        if user_id in self._busy:
+            self.contended += 1
+            yield False
+            return
+        self._busy.add(user_id)
+        self.claimed += 1
+        try:
+            yield True
+        finally:
+            self._busy.discard(user_id)
+
+    def stats(self):
+        return {"in_flight": len(self._busy), "claimed": self.claimed, "contended": self.contended}
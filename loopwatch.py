@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+
+def _folded(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopWatchdog:
+    """Watches the event loop from a separate thread.
+
+    A heartbeat task stamps the time every ``interval`` seconds. When the
+    stamp goes stale by more than ``threshold`` the loop is stuck in a
+    callback, so the watchdog grabs the loop thread's stack right then and
+    logs it once the loop recovers, tagged with the handler that was
+    running (see ``attribute``).
+
+    ``profile`` samples the loop thread's stack for a while and writes the
+    counts in the folded format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, threshold=0.1, interval=0.02, sample_interval=0.005):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.handlers = weakref.WeakKeyDictionary()
+        self.blocks = 0
+        self.max_block = 0.0
+        self._loop = None
+        self._loop_thread = None
+        self._beat = 0.0
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._profiling = False
+
+    def attribute(self, label):
+        """Tags the running task with the handler it is serving."""
+        task = asyncio.current_task()
+        if task is not None:
+            self.handlers[task] = label
+
+    def _running(self):
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "loop callback"
+        return self.handlers.get(task) or task.get_name()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        blocked = None
+        stale = 0.0
+        while not self._stopping.wait(self.interval):
+            lag = time.monotonic() - self._beat - self.interval
+            if lag > self.threshold:
+                if blocked is None:
+                    frame = sys._current_frames().get(self._loop_thread)
+                    blocked = (self._running(), "".join(traceback.format_stack(frame)) if frame else "")
+                stale = lag
+            elif blocked is not None:
+                handler, stack = blocked
+                self.blocks += 1
+                self.max_block = max(self.max_block, stale)
+                log.warning("Event loop blocked for at least %.3fs by %s:\n%s", stale, handler, stack)
+                blocked = None
+
+    def profile(self, seconds, path=None):
+        """Samples the loop thread for ``seconds`` in a background thread and
+        writes folded stacks to ``path``. Returns False if a profile is
+        already running."""
+        if self._profiling:
+            return False
+        if self._loop_thread is None:
+            self._loop_thread = threading.get_ident()
+        path = path or f"loop-profile-{int(time.time())}.folded"
+        self._profiling = True
+        threading.Thread(target=self._sample, args=(seconds, path), name="loop-profiler", daemon=True).start()
+        return True
+
+    def _sample(self, seconds, path):
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    stacks[_folded(frame)] += 1
+                del frame
+                time.sleep(self.sample_interval)
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            log.info("Wrote %d samples of the event loop to %s", sum(stacks.values()), path)
+        finally:
+            self._profiling = False
+
+    def stats(self):
+        return {"blocks": self.blocks, "max_block": self.max_block}
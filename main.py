@@ -1,833 +1,1093 @@
-import discord
-from discord.ext import commands
-import os
-import random
-import asyncio
-from dotenv import load_dotenv
-import logging
-import json
-import sqlite3
-import time
-from datetime import datetime
-
-CURRENCY_FILE = "currency_data.json"
-
-DB_FILE = "bot_data.db"
-
-
-
-def init_db():
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-    
-    
-    cursor.execute('''CREATE TABLE IF NOT EXISTS currency (
-        user_id INTEGER PRIMARY KEY,
-        balance INTEGER DEFAULT 100
-    )''')
-
-    
-    cursor.execute('''CREATE TABLE IF NOT EXISTS stats (
-        user_id INTEGER PRIMARY KEY,
-        games_played INTEGER DEFAULT 0,
-        wins INTEGER DEFAULT 0,
-        losses INTEGER DEFAULT 0,
-        total_earned INTEGER DEFAULT 0,
-        most_common_symbol TEXT DEFAULT '',
-        largest_win INTEGER DEFAULT 0
-    )''')
-
-    
-    cursor.execute('''CREATE TABLE IF NOT EXISTS challenges (
-        user_id INTEGER PRIMARY KEY,
-        daily_wins INTEGER DEFAULT 0,
-        weekly_wins INTEGER DEFAULT 0
-    )''')
-
-    conn.commit()
-    conn.close()
-
-
-init_db()
-
-def init_blackjack_stats():
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS blackjack_stats (
-            user_id INTEGER PRIMARY KEY,
-            blackjack_wins INTEGER DEFAULT 0,
-            blackjack_losses INTEGER DEFAULT 0,
-            blackjack_total_earned INTEGER DEFAULT 0,
-            blackjack_largest_win INTEGER DEFAULT 0
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-init_blackjack_stats()
-
-def reset_challenges(user_id):
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM challenges WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-
-    current_time = int(time.time())
-    daily_reset_time = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
-    weekly_reset_time = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).replace(weekday=6).timestamp())  # Reset on Sunday
-
-    if result:
-        
-        daily_reset = result[3] < daily_reset_time
-        weekly_reset = result[4] < weekly_reset_time
-
-        if daily_reset or weekly_reset:
-            cursor.execute("""
-                UPDATE challenges SET
-                    daily_wins = ?,
-                    weekly_wins = ?,
-                    last_daily_reset = ?,
-                    last_weekly_reset = ?
-                WHERE user_id = ?
-            """, (0, 0, current_time, current_time, user_id))
-            conn.commit()
-
-    conn.close()
-
-def update_challenge_progress(user_id, game_type="blackjack"):
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM challenges WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-
-    if result:
-        daily_wins, weekly_wins, _, _ = result[1:5]
-        
-        if game_type == "blackjack":
-            daily_wins += 1
-            weekly_wins += 1
-        
-        cursor.execute("""
-            UPDATE challenges SET
-                daily_wins = ?,
-                weekly_wins = ?
-            WHERE user_id = ?
-        """, (daily_wins, weekly_wins, user_id))
-        conn.commit()
-
-    conn.close()
-
-
-def get_balance(user_id):
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-    if result is None:
-        cursor.execute("INSERT INTO currency (user_id, balance) VALUES (?, 100)", (user_id,))
-        conn.commit()
-        balance = 100
-    else:
-        balance = result[0]
-    conn.close()
-    return balance
-
-def update_balance(user_id, new_balance):
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-    cursor.execute("REPLACE INTO currency (user_id, balance) VALUES (?, ?)", (user_id, new_balance))
-    conn.commit()
-    conn.close()
-
-def update_stats(user_id, winnings, bet, final_grid=None):
-    conn = sqlite3.connect("bot_data.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM stats WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-
-    
-    most_common_symbol = None
-    if final_grid is not None:
-        most_common_counts = {}
-        for row in final_grid:
-            for symbol in row:
-                most_common_counts[symbol] = most_common_counts.get(symbol, 0) + 1
-        most_common_symbol = max(most_common_counts, key=most_common_counts.get)
-
-    profit = max(0, winnings - bet)
-    win = winnings > bet
-
-    if result:
-        games_played, wins, losses, total_earned, _, largest_win = result[1:]
-        wins += 1 if win else 0
-        losses += 0 if win else 1
-        total_earned += profit
-        largest_win = max(largest_win, profit)
-
-        
-        cursor.execute(""" 
-            UPDATE stats SET
-                games_played = games_played + 1,
-                wins = ?,
-                losses = ?,
-                total_earned = ?,
-                most_common_symbol = ?,
-                largest_win = ?
-            WHERE user_id = ?
-        """, (wins, losses, total_earned, most_common_symbol if most_common_symbol else "", largest_win, user_id))
-    else:
-        cursor.execute(""" 
-            INSERT INTO stats (user_id, games_played, wins, losses, total_earned, most_common_symbol, largest_win)
-            VALUES (?, 1, ?, ?, ?, ?, ?)
-        """, (user_id, 1 if win else 0, 0 if win else 1, profit, most_common_symbol if most_common_symbol else "", profit))
-
-    conn.commit()
-    conn.close()
-    
-
-
-STATS_FILE = "stats_data.json"
-
-
-logging.basicConfig(level=logging.INFO)
-
-
-load_dotenv("bot_key.env")
-
-
-bot_token = os.getenv("DISCORD_BOT_TOKEN")
-if not bot_token:
-    raise ValueError("Bot token not found in .env file. Check the file path and variable name.")
-
-logging.info("Bot token loaded successfully.")  
-
-
-intents = discord.Intents.default()
-intents.message_content = True
-
-GUILD_ID = 1318433011116544010  
-
-slot_symbols = ["🍒", "🍉", "🔔", "⭐", "💎", "🤡"]
-symbol_weights = {
-    "🍒": 0.27,    
-    "🍉": 0.2,    
-    "🔔": 0.1,   
-    "⭐": 0.08,     
-    "💎": 0.05,   
-    "🤡": 0.3      
-}
-payouts = {
-    "🍒🍒🍒": 5,
-    "🍉🍉🍉": 10,
-    "🔔🔔🔔": 20,
-    "⭐⭐⭐": 50,
-    "💎💎💎": 100
-}
-
-class Client(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix='/', intents=intents)
-        self.games = {}  
-
-    async def on_ready(self):
-        print(f'Logged on as {self.user}')
-        try:
-            synced = await self.tree.sync()
-            print(f"Synced {len(synced)} command(s) globally.")
-        except Exception as e:
-            print(f"Failed to sync commands: {e}")
-
-
-client = Client()
-
-@client.tree.command(name="balance", description="Check your virtual currency balance")
-async def balance(interaction: discord.Interaction):
-    user_id = str(interaction.user.id)
-    balance = get_balance(user_id)
-    await interaction.response.defer(thinking=True)
-    await asyncio.sleep(0.5)
-    await interaction.followup.send(f"{interaction.user.name}, your balance is 💰 {balance}")
-
-
-
-@client.tree.command(name="slots", description="Play a slot machine with a bet")
-async def slots(interaction: discord.Interaction, bet: int):
-    user_id = str(interaction.user.id)
-
-    if bet <= 0:
-        await interaction.response.send_message("Invalid bet amount.")
-        return
-
-    balance = get_balance(user_id)
-    if bet > balance:
-        await interaction.response.send_message("You don't have enough balance to bet that amount.")
-        return
-
-    class SlotView(discord.ui.View):
-        def __init__(self):
-            super().__init__(timeout=60)
-            self.message = None
-            self.bet = bet
-            self.keep_spinning = True
-            self.active = True
-
-        def freeze(self):
-            for item in self.children:
-                item.disabled = True
-
-        def unfreeze(self):
-            for item in self.children:
-                item.disabled = False
-
-        async def disable_view(self):
-            self.active = False
-            self.freeze()
-            if self.message:
-                await self.message.edit(view=self)
-
-        @discord.ui.button(label="⬆ Increase Bet", style=discord.ButtonStyle.secondary)
-        async def increase_bet(self, interaction_button: discord.Interaction, button: discord.ui.Button):
-            if not self.active:
-                await interaction_button.response.send_message("This game has ended.", ephemeral=True)
-                return
-            if str(interaction_button.user.id) != user_id:
-                await interaction_button.response.send_message("This isn't your game!", ephemeral=True)
-                return
-            if self.bet + 1 <= get_balance(user_id):
-                self.bet += 1
-                await interaction_button.response.defer()
-                await self.message.edit(content=f"🎲 Bet increased to {self.bet}", view=self)
-            else:
-                await interaction_button.response.send_message("Not enough balance to increase bet!", ephemeral=True)
-
-        @discord.ui.button(label="⬇ Decrease Bet", style=discord.ButtonStyle.secondary)
-        async def decrease_bet(self, interaction_button: discord.Interaction, button: discord.ui.Button):
-            if not self.active:
-                await interaction_button.response.send_message("This game has ended.", ephemeral=True)
-                return
-            if str(interaction_button.user.id) != user_id:
-                await interaction_button.response.send_message("This isn't your game!", ephemeral=True)
-                return
-            if self.bet > 1:
-                self.bet -= 1
-                await interaction_button.response.defer()
-                await self.message.edit(content=f"🎲 Bet decreased to {self.bet}", view=self)
-            else:
-                await interaction_button.response.send_message("Minimum bet is 1!", ephemeral=True)
-
-        @discord.ui.button(label="Spin Again 🎰", style=discord.ButtonStyle.success)
-        async def spin_again(self, interaction_button: discord.Interaction, button: discord.ui.Button):
-            if not self.active:
-                await interaction_button.response.send_message("This game has ended.", ephemeral=True)
-                return
-            if str(interaction_button.user.id) != user_id:
-                await interaction_button.response.send_message("This isn't your game!", ephemeral=True)
-                return
-            await self.spin(interaction_button)
-
-        @discord.ui.button(label="Stop 🚫", style=discord.ButtonStyle.danger)
-        async def stop(self, interaction_button: discord.Interaction, button: discord.ui.Button):
-            if not self.active:
-                await interaction_button.response.send_message("This game has already ended.", ephemeral=True)
-                return
-            if str(interaction_button.user.id) != user_id:
-                await interaction_button.response.send_message("This isn't your game!", ephemeral=True)
-                return
-            self.keep_spinning = False
-            await self.disable_view()
-            await interaction_button.response.edit_message(content="🎰 Game ended.", view=self)
-            
-        async def animate_vertical_spin(self):
-            rows, columns = 3, 3
-            lock_steps = [1, 2, 3]  
-            final_symbols = [  
-                [random.choice(slot_symbols) for _ in range(rows)] for _ in range(columns)
-            ]
-
-            for step in range(4):  
-                grid = []
-
-                for row in range(rows):
-                    current_row = []
-                    for col in range(columns):
-                        if step >= lock_steps[col]:
-                            current_row.append(final_symbols[col][row])
-                        else:
-                            current_row.append(random.choice(slot_symbols))
-                    grid.append(current_row)
-
-                content = f"🎰 Spinning...\n{format_grid(grid)}\n🎲 Current Bet: {self.bet}"
-                await self.message.edit(content=content)
-                await asyncio.sleep(0.4)
-
-            
-            final_grid = [[final_symbols[col][row] for col in range(columns)] for row in range(rows)]
-            return final_grid
-
-        async def spin(self, interaction_obj):
-            if get_balance(user_id) < self.bet:
-                await interaction_obj.followup.send("❌ You don't have enough coins to spin again!", ephemeral=True)
-                self.keep_spinning = False
-                if self.message:
-                    await self.disable_view()
-                return
-
-            
-            update_balance(user_id, get_balance(user_id) - self.bet)
-
-            if not self.message:
-                await interaction_obj.response.defer()
-                self.message = await interaction_obj.followup.send("🎰 Spinning...")
-
-            self.freeze()
-            await self.message.edit(view=self)
-
-            final_grid = await self.animate_vertical_spin()
-            winnings = calculate_winnings(final_grid, self.bet)
-
-            
-            update_balance(user_id, get_balance(user_id) + winnings)
-            update_stats(user_id, winnings, self.bet, final_grid)
-
-            
-            if winnings > 0:
-                
-                conn = sqlite3.connect("bot_data.db")
-                cursor = conn.cursor()
-                cursor.execute("SELECT daily_wins FROM challenges WHERE user_id = ?", (user_id,))
-                daily_wins_row = cursor.fetchone()
-
-                if daily_wins_row:
-                    daily_wins = daily_wins_row[0] + 1
-                    cursor.execute("UPDATE challenges SET daily_wins = ? WHERE user_id = ?", (daily_wins, user_id))
-                else:
-                    cursor.execute("INSERT INTO challenges (user_id, daily_wins) VALUES (?, ?)", (user_id, 1))
-
-                conn.commit()
-                conn.close()
-
-            new_balance = get_balance(user_id)
-            result_text = (
-                f"🎰 Final Result!\n{format_grid(final_grid)}\n"
-                f"You {'won' if winnings > 0 else 'lost'} {abs(winnings - self.bet)} coins!\n"
-                f"New balance: 💰 {new_balance}\n"
-                f"🎲 Current Bet: {self.bet}"
-            )
-
-            self.unfreeze()
-            await self.message.edit(content=result_text, view=self)
-
-
-
-    def generate_grid():
-        return [[random.choices(slot_symbols, weights=[symbol_weights[s] for s in slot_symbols])[0] for _ in range(3)] for _ in range(3)]
-
-    def format_grid(grid):
-        return "```\n" + "\n".join([" | ".join(row) for row in grid]) + "\n```"
-
-    view = SlotView()
-    await view.spin(interaction)
-
-
-def calculate_winnings(grid, bet):
-    
-    for line in grid + list(zip(*grid)) + [[grid[i][i] for i in range(3)], [grid[i][2-i] for i in range(3)]]:
-        line_str = "".join(line)
-        if line_str in payouts:
-            return payouts[line_str] * bet
-    return 0
-
-@client.tree.command(name="leaderboard", description="Show the top users with the most virtual currency")
-async def leaderboard(interaction: discord.Interaction):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_id, balance FROM currency ORDER BY balance DESC LIMIT 5")
-    rows = cursor.fetchall()
-    conn.close()
-
-    if not rows:
-        await interaction.response.send_message("No currency data available yet.")
-        return
-
-    embed = discord.Embed(
-        title="🏆 Leaderboard — Top Richest Players",
-        description="Here are the top 5 users with the highest balance!",
-        color=discord.Color.red()
-    )
-
-    for i, (user_id, balance) in enumerate(rows, start=1):
-        try:
-            user = await client.fetch_user(int(user_id))
-            embed.add_field(
-                name=f"{i}. {user.name}",
-                value=f"💰 {balance} coins",
-                inline=False
-            )
-        except discord.NotFound:
-            embed.add_field(
-                name=f"{i}. Unknown User ({user_id})",
-                value=f"💰 {balance} coins",
-                inline=False
-            )
-
-    await interaction.response.send_message(embed=embed)
-
-
-@client.tree.command(name="profile", description="View your game stats and balance")
-async def profile(interaction: discord.Interaction, user: discord.User = None):
-    target = user or interaction.user
-    uid = target.id
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    
-    cursor.execute("SELECT games_played, wins, losses, total_earned, most_common_symbol, largest_win FROM stats WHERE user_id = ?", (uid,))
-    row = cursor.fetchone()
-
-    
-    cursor.execute("SELECT blackjack_wins, blackjack_losses, blackjack_total_earned, blackjack_largest_win FROM blackjack_stats WHERE user_id = ?", (uid,))
-    blackjack_row = cursor.fetchone()
-
-    
-    cursor.execute("SELECT balance FROM currency WHERE user_id = ?", (uid,))
-    balance_row = cursor.fetchone()
-    conn.close()
-
-    balance = balance_row[0] if balance_row else 100
-
-    if not row:
-        await interaction.response.send_message(f"{target.name} hasn't played any games yet!", ephemeral=True)
-        return
-
-    games, wins, losses, total_earned, most_common_symbol, largest_win = row
-    blackjack_wins, blackjack_losses, blackjack_total_earned, blackjack_largest_win = blackjack_row if blackjack_row else (0, 0, 0, 0)
-    win_rate = (wins / games * 100) if games > 0 else 0
-
-    try:
-        most_common = json.loads(most_common_symbol)
-        most_common_sorted = sorted(most_common.items(), key=lambda x: x[1], reverse=True)
-        common_symbol_text = most_common_sorted[0][0] if most_common_sorted else "N/A"
-    except Exception:
-        common_symbol_text = "N/A"
-
-    embed = discord.Embed(
-        title=f"{target.name}'s Game Stats 🎮",
-        color=discord.Color.gold()
-    )
-    embed.set_thumbnail(url=target.display_avatar.url)
-
-    
-    embed.add_field(name="💰 Balance", value=str(balance), inline=True)
-    embed.add_field(name="🎮 Games Played", value=str(games), inline=True)
-    embed.add_field(name="✅ Wins", value=str(wins), inline=True)
-    embed.add_field(name="❌ Losses", value=str(losses), inline=True)
-    embed.add_field(name="📈 Win Rate", value=f"{win_rate:.2f}%", inline=True)
-    embed.add_field(name="💸 Total Earned", value=str(total_earned), inline=True)
-    embed.add_field(name="⭐ Most Common Symbol", value=common_symbol_text, inline=True)
-    embed.add_field(name="🏆 Largest Win", value=str(largest_win), inline=True)
-
-    embed.add_field(name="\u200b", value="\u200b", inline=False)  
-
-   
-    embed.add_field(name="♠️ Blackjack Wins", value=str(blackjack_wins), inline=True)
-    embed.add_field(name="♦️ Blackjack Losses", value=str(blackjack_losses), inline=True)
-    embed.add_field(name="💵 Blackjack Total Earned", value=str(blackjack_total_earned), inline=True)
-    embed.add_field(name="🎯 Blackjack Largest Win", value=str(blackjack_largest_win), inline=True)
-
-    await interaction.response.send_message(embed=embed)
-
-
-
-
-
-@client.tree.command(name="tos", description="Get a link to terms of service")
-async def tos(interactiom: discord.Interaction):
-    await interactiom.user.send("https://gist.github.com/korolbbichey/ec9757512835365e37c3c8823d096ccb")
-
-@client.tree.command(name="help", description="Get a list of all available commands in a private message")
-async def help_command(interaction: discord.Interaction):
-    help_text = """
-📖 **Bankroll Command List**
-
-```
-/balance              - Check your virtual coin balance
-/slots <bet>          - Play a slot machine game with your bet
-/leaderboard          - View the top 5 richest players
-/profile [@user]      - View your own or someone else's stats
-/daily_reward         - Claim daily reward(Updates every day)
-/blackjack            - Play a blackjack game with your bet
-/tos                  - View the Terms of Service 
-💡 Need help? Contact the dev or visit the support server! ```
-"""
-    try:
-        await interaction.user.send(help_text)
-        await interaction.response.send_message("✅ Help has been sent to your DMs!", ephemeral=True)
-    except discord.Forbidden:
-        await interaction.response.send_message("❌ I couldn't send you a DM. Please check your privacy settings!", ephemeral=True)
-        
-@client.tree.command(name="add_balance", description="Manually add virtual currency to a player's balance")
-async def add_balance(interaction: discord.Interaction, user: discord.User, amount: int):
-    
-    if amount <= 0:
-        await interaction.response.send_message("Amount must be positive!", ephemeral=True)
-        return
-
-    
-    if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
-        return
-
-    user_id = user.id
-
-   
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,) )
-    result = cursor.fetchone()
-
-    if result is None:
-        
-        cursor.execute("INSERT INTO currency (user_id, balance) VALUES (?, ?)", (user_id, amount))
-    else:
-        
-        current_balance = result[0]
-        new_balance = current_balance + amount
-        cursor.execute("REPLACE INTO currency (user_id, balance) VALUES (?, ?)", (user_id, new_balance))
-
-    conn.commit()
-    conn.close()
-
-    
-    await interaction.response.send_message(f"Successfully added 💰 {amount} to {user.name}'s balance. New balance: 💰 {new_balance}")
-    
-from datetime import datetime
-
-@client.tree.command(name="daily_reward", description="Claim your daily reward")
-async def daily_reward(interaction: discord.Interaction):
-    user_id = str(interaction.user.id)
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    
-    cursor.execute("PRAGMA table_info(currency)")
-    columns = [column[1] for column in cursor.fetchall()]
-    if "last_claim_date" not in columns:
-        cursor.execute("ALTER TABLE currency ADD COLUMN last_claim_date TEXT")
-
-    
-    cursor.execute("SELECT balance, last_claim_date FROM currency WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-
-    today = datetime.today().date()
-
-    if result:
-        balance, last_claim_str = result
-
-        if last_claim_str:
-            last_claim_date = datetime.strptime(last_claim_str, "%Y-%m-%d").date()
-            if last_claim_date == today:
-                await interaction.response.send_message("You’ve already claimed your daily reward today. Try again tomorrow!", ephemeral=True)
-                conn.close()
-                return
-    else:
-        
-        balance = 100
-        cursor.execute("INSERT INTO currency (user_id, balance, last_claim_date) VALUES (?, ?, ?)", (user_id, balance, today.strftime("%Y-%m-%d")))
-        conn.commit()
-        reward = 50
-        await interaction.response.send_message(f"You've been initialized and received your first daily reward of 💰 {reward}!")
-        conn.close()
-        return
-
-
-    reward = 50
-    new_balance = balance + reward
-
-    cursor.execute("UPDATE currency SET balance = ?, last_claim_date = ? WHERE user_id = ?", (new_balance, today.strftime("%Y-%m-%d"), user_id))
-    conn.commit()
-    conn.close()
-
-    await interaction.response.send_message(f"✅ You've claimed your daily reward of 💰 {reward}! Your new balance is 💰 {new_balance}.", ephemeral=True)
-    
-@client.tree.command(name="blackjack", description="Play a game of Blackjack with a bet")
-async def blackjack(interaction: discord.Interaction, bet: int):
-    user_id = str(interaction.user.id)
-    if bet <= 0:
-        await interaction.response.send_message("⚠️ Bet must be greater than zero.", ephemeral=True)
-        return
-
-    balance = get_balance(user_id)
-    if bet > balance:
-        await interaction.response.send_message("❌ You don't have enough balance to bet that amount.", ephemeral=True)
-        return
-
-    def create_deck():
-        cards = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        deck = cards * 4
-        random.shuffle(deck)
-        return deck
-    
-    deck = create_deck()
-    player_hand = [deck.pop(), deck.pop()]
-    dealer_hand = [deck.pop(), deck.pop()]
-
-    class BlackjackView(discord.ui.View):
-        def __init__(self):
-            super().__init__(timeout=60)
-            self.player_hand = player_hand
-            self.dealer_hand = dealer_hand
-            self.deck = deck
-            self.bet = bet
-            self.message = None
-            self.ended = False
-
-        def hand_value(self, hand):
-            value, aces = 0, 0
-            for card in hand:
-                if card in ['J', 'Q', 'K']:
-                    value += 10
-                elif card == 'A':
-                    value += 11
-                    aces += 1
-                else:
-                    value += int(card)
-            while value > 21 and aces:
-                value -= 10
-                aces -= 1
-            return value
-
-        def format_hand(self, hand, hide_second=False):
-            return " ".join(['🂠' if i == 1 and hide_second else f"`{card}`" for i, card in enumerate(hand)])
-
-        async def update_message(self, interaction, hide_dealer=True, footer="Choose an action."):
-            embed = discord.Embed(title="🃏 Blackjack", color=discord.Color.dark_green())
-            embed.add_field(name="Your Hand", value=f"{self.format_hand(self.player_hand)} ({self.hand_value(self.player_hand)})", inline=False)
-            embed.add_field(name="Dealer's Hand", value=self.format_hand(self.dealer_hand, hide_second=hide_dealer), inline=False)
-            embed.set_footer(text=footer)
-            if self.message:
-                await self.message.edit(embed=embed, view=self)
-            else:
-                self.message = await interaction.followup.send(embed=embed, view=self)
-
-        def end_game_embed(self, outcome, winnings):
-            embed = discord.Embed(title=f"🎲 {outcome}", color=discord.Color.gold())
-            embed.add_field(name="Your Hand", value=f"{self.format_hand(self.player_hand)} ({self.hand_value(self.player_hand)})", inline=False)
-            embed.add_field(name="Dealer's Hand", value=f"{self.format_hand(self.dealer_hand)} ({self.hand_value(self.dealer_hand)})", inline=False)
-            embed.add_field(name="💰 Result", value=f"You {'won' if winnings > 0 else 'lost'} {abs(winnings)} coins", inline=False)
-            return embed
-
-        def disable_all(self):
-            for item in self.children:
-                item.disabled = True
-
-        @discord.ui.button(label="🃏 Hit", style=discord.ButtonStyle.primary)
-        async def hit(self, interaction_button: discord.Interaction, _):
-            if self.ended:
-                return await interaction_button.response.send_message("Game has already ended.", ephemeral=True)
-            self.player_hand.append(self.deck.pop())
-            if self.hand_value(self.player_hand) > 21:
-                update_balance(user_id, balance - self.bet)
-                update_stats(user_id, -self.bet, self.bet, None)
-                self.ended = True
-                self.disable_all()
-                await interaction_button.response.edit_message(embed=self.end_game_embed("💥 You Busted!", -self.bet), view=self)
-            else:
-                await interaction_button.response.defer()
-                await self.update_message(interaction_button)
-
-        @discord.ui.button(label="✋ Stand", style=discord.ButtonStyle.secondary)
-        async def stand(self, interaction_button: discord.Interaction, _):
-            if self.ended:
-                return await interaction_button.response.send_message("Game has already ended.", ephemeral=True)
-            
-            while self.hand_value(self.dealer_hand) < 17:
-                self.dealer_hand.append(self.deck.pop())
-
-            player_val = self.hand_value(self.player_hand)
-            dealer_val = self.hand_value(self.dealer_hand)
-
-            if dealer_val > 21 or player_val > dealer_val:
-                outcome = "🏆 You Win!"
-                winnings = self.bet
-            elif player_val == dealer_val:
-                outcome = "🤝 It's a Tie!"
-                winnings = 0
-            else:
-                outcome = "😢 You Lose!"
-                winnings = -self.bet
-
-            update_balance(user_id, balance + winnings)
-            update_stats(user_id, winnings, self.bet, None)
-
-            self.ended = True
-            self.disable_all()
-            await interaction_button.response.edit_message(embed=self.end_game_embed(outcome, winnings), view=self)
-
-    
-
-    await interaction.response.defer()
-    view = BlackjackView()
-    await view.update_message(interaction)
-
-@client.tree.command(name="coinflip", description="Flip a coin and win double your bet if you guess right!")
-async def coinflip(interaction: discord.Interaction, guess: str, bet: int):
-    user_id = str(interaction.user.id)
-    guess = guess.lower()
-
-    if guess not in ["heads", "tails"]:
-        await interaction.response.send_message("Please choose either 'heads' or 'tails'.", ephemeral=True)
-        return
-
-    if bet <= 0:
-        await interaction.response.send_message("Your bet must be greater than 0.", ephemeral=True)
-        return
-
-    balance = get_balance(user_id)
-    if bet > balance:
-        await interaction.response.send_message("You don't have enough coins for that bet.", ephemeral=True)
-        return
-
-    
-    embed = discord.Embed(
-        title="🪙 Coin Flip!",
-        description="Flipping the coin...",
-        color=discord.Color.random()
-    )
-    embed.set_footer(text="You guessed: " + guess.capitalize())
-    message = await interaction.response.send_message(embed=embed)
-    message = await interaction.original_response()
-
-    
-    flip_sequence = ["Heads 🟤", "Tails ⚪", "Heads 🟤", "Tails ⚪", "Heads 🟤", "Tails ⚪"]
-    for flip in flip_sequence:
-        embed.description = f"Flipping the coin...\n**{flip}**"
-        await message.edit(embed=embed)
-        await asyncio.sleep(0.5)
-
-    
-    outcome = random.choice(["heads", "tails"])
-    emoji = "🟤" if outcome == "heads" else "⚪"
-    win = guess == outcome
-
-    if win:
-        winnings = bet * 2
-        update_balance(user_id, balance + bet)
-        result = f"🎉 It landed on **{outcome.capitalize()} {emoji}**!\nYou win **{bet}** coins!"
-    else:
-        update_balance(user_id, balance - bet)
-        result = f"😢 It landed on **{outcome.capitalize()} {emoji}**!\nYou lost **{bet}** coins."
-
-    
-    embed.title = "🪙 Coin Flip Result"
-    embed.description = result + f"\n\n💰 New Balance: **{get_balance(user_id)}**"
-    embed.color = discord.Color.green() if win else discord.Color.red()
-
-    await message.edit(embed=embed)
-
-
-client.run(bot_token)
-
+import time
+
+# Taken before the heavy imports so the startup breakdown includes them.
+_started = time.perf_counter()
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+import os
+import random
+import asyncio
+from dotenv import load_dotenv
+import logging
+import signal
+import functools
+import hashlib
+import json
+import re
+import tempfile
+from datetime import datetime, timedelta
+from typing import Literal
+
+from animation import AnimationPolicy
+import blackjack_engine
+from edits import EditScheduler
+from games import BlackjackGame, GameRegistry, SlotGame, game_from_row, game_to_row, new_game_id
+from locks import UserLocks
+from loopwatch import LoopWatchdog
+import metrics
+from ratelimit import RateLimiter
+from leaderboard import LeaderboardSnapshot, UserNameCache
+from profiles import ProfileCache
+from slot_engine import MACHINES
+from storage import Database
+
+load_dotenv("bot_key.env")
+
+DB_FILE = os.getenv("BANKROLL_DB", "bot_data.db")
+DB_PROFILE = os.getenv("BANKROLL_DB_PROFILE", "wal")
+# Ledger rows older than LEDGER_KEEP_DAYS move to compressed daily files; 0 keeps them all.
+LEDGER_ARCHIVE_DIR = os.getenv("LEDGER_ARCHIVE_DIR", "ledger_archive")
+LEDGER_KEEP_DAYS = int(os.getenv("LEDGER_KEEP_DAYS", "90"))
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+LOOP_WATCHDOG_THRESHOLD = float(os.getenv("LOOP_WATCHDOG_THRESHOLD", "0"))
+LOOP_PROFILE_SECONDS = float(os.getenv("LOOP_PROFILE_SECONDS", "0"))
+# Command cooldowns: COOLDOWN_RATE calls per COOLDOWN_SECONDS for each user,
+# and the GUILD_ pair for a whole server.
+COOLDOWN_RATE = int(os.getenv("COOLDOWN_RATE", "5"))
+COOLDOWN_SECONDS = float(os.getenv("COOLDOWN_SECONDS", "10"))
+GUILD_COOLDOWN_RATE = int(os.getenv("GUILD_COOLDOWN_RATE", "60"))
+GUILD_COOLDOWN_SECONDS = float(os.getenv("GUILD_COOLDOWN_SECONDS", "10"))
+# Sync commands to GUILD_ID only, where changes show up at once, while developing.
+DEV_SYNC = os.getenv("DEV_SYNC") == "1"
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC") == "1"
+# Role and server-wide targets need the privileged members intent, which
+# must also be enabled as "Server Members Intent" in the developer portal.
+MEMBERS_INTENT = os.getenv("MEMBERS_INTENT") == "1"
+
+startup_times = []
+_last_mark = _started
+
+
+def mark(phase):
+    global _last_mark
+    now = time.perf_counter()
+    startup_times.append((phase, now - _last_mark))
+    _last_mark = now
+
+registry = metrics.Registry()
+HANDLER_SECONDS = registry.histogram("bankroll_handler_seconds", "Time spent in slash command and button callbacks", ["kind", "name"])
+DB_SECONDS = registry.histogram("bankroll_db_query_seconds", "Time callers waited on each database helper", ["query"])
+DISCORD_REQUESTS = registry.counter("bankroll_discord_requests_total", "Discord API requests by route and status", ["method", "route", "status"])
+WAGERED = registry.counter("bankroll_wagered_coins_total", "Coins wagered per game", ["game"])
+
+profile_cache = ProfileCache()
+db = Database(DB_FILE, on_query=lambda query, seconds: DB_SECONDS.observe(seconds, query), on_change=profile_cache.invalidate,
+              profile=DB_PROFILE, archive_dir=LEDGER_ARCHIVE_DIR if LEDGER_KEEP_DAYS else None,
+              archive_after=LEDGER_KEEP_DAYS * 86400)
+
+top_players = LeaderboardSnapshot(db)
+user_names = UserNameCache()
+edits = EditScheduler()
+animation = AnimationPolicy()
+game_locks = UserLocks()
+limiter = RateLimiter(rate=COOLDOWN_RATE, per=COOLDOWN_SECONDS, guild_rate=GUILD_COOLDOWN_RATE, guild_per=GUILD_COOLDOWN_SECONDS)
+shoe = blackjack_engine.Shoe(decks=6)
+watchdog = LoopWatchdog(threshold=LOOP_WATCHDOG_THRESHOLD or 0.1)
+
+registry.gauge("bankroll_active_games", "Games with live buttons", lambda: len(client.games))
+registry.gauge("bankroll_persistent_views", "Views registered with the gateway", lambda: len(client.persistent_views))
+registry.gauge("bankroll_edit_queue_depth", "Message edits waiting for channel budget", lambda: edits.queue_depth)
+registry.collected_counter("bankroll_edit_frames_total", "Animation frames by outcome", lambda: {
+    ("sent",): edits.frames_sent, ("dropped",): edits.frames_dropped, ("rate_limited",): edits.rate_limited,
+}, ["outcome"])
+registry.gauge("bankroll_loop_lag_seconds", "Smoothed event loop lag seen by the animation policy", lambda: animation.lag)
+registry.collected_counter("bankroll_animations_total", "Animations played per tier", lambda: {
+    (tier,): count for tier, count in animation.games_by_tier.items()
+}, ["tier"])
+registry.collected_counter("bankroll_cooldown_rejections_total", "Calls refused by the rate limiter", lambda: {
+    ("user",): limiter.rejected_user, ("guild",): limiter.rejected_guild,
+}, ["scope"])
+registry.collected_counter("bankroll_busy_rejections_total", "Clicks refused while a move was in flight", lambda: game_locks.contended)
+registry.collected_counter("bankroll_loop_blocks_total", "Times the watchdog caught the event loop blocked", lambda: watchdog.blocks)
+registry.gauge("bankroll_loop_block_max_seconds", "Longest event loop block the watchdog has seen", lambda: watchdog.max_block)
+registry.collected_counter("bankroll_profile_cache_total", "Profile embed cache lookups", lambda: {
+    ("hit",): profile_cache.hits, ("miss",): profile_cache.misses,
+}, ["result"])
+registry.collected_counter("bankroll_db_flushes_total", "Write-behind flushes", lambda: db.flushes)
+registry.collected_counter("bankroll_ledger_archived_rows_total", "Ledger rows moved to the archive", lambda: db.rows_archived)
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+intents = discord.Intents.default()
+intents.message_content = True
+intents.members = MEMBERS_INTENT
+
+GUILD_ID = 1318433011116544010  
+
+def on_rate_limited(method, path):
+    if method == "PATCH" and "/messages/" in path:
+        edits.note_rate_limited()
+
+
+class Client(commands.Bot):
+    def __init__(self):
+        # Guilds are chunked on first use by guild_members instead of all at login.
+        super().__init__(command_prefix='/', intents=intents, http_trace=metrics.http_trace(DISCORD_REQUESTS, on_rate_limited),
+                         chunk_guilds_at_startup=False)
+        self.games = GameRegistry(ttl=120)
+        self._expiry_task = None
+        self._metrics_runner = None
+        self._sync_task = None
+        self._ready_once = False
+
+    async def setup_hook(self):
+        mark("login")
+        self._sync_task = asyncio.create_task(self.sync_commands())
+        db.start()
+        top_players.start()
+        animation.start()
+        limiter.start()
+        if LOOP_WATCHDOG_THRESHOLD:
+            watchdog.start()
+            if hasattr(signal, "SIGUSR1"):
+                # kill -USR1 <pid> profiles a window of live traffic.
+                asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, watchdog.profile, LOOP_PROFILE_SECONDS or 30)
+        if LOOP_PROFILE_SECONDS:
+            watchdog.profile(LOOP_PROFILE_SECONDS)
+        await self.restore_games()
+        if METRICS_PORT:
+            try:
+                self._metrics_runner = await metrics.serve(registry, port=METRICS_PORT)
+            except OSError as e:
+                logging.warning("Metrics endpoint disabled: %s", e)
+        self._expiry_task = asyncio.create_task(self.expire_games())
+        mark("setup")
+
+    async def sync_commands(self):
+        """Pushes the command tree to Discord only when it differs from the
+        last tree pushed. Syncing is slow and rate limited, and most starts
+        don't change any command."""
+        started = time.perf_counter()
+        guild = discord.Object(id=GUILD_ID) if DEV_SYNC else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)]
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        key = f"command_hash:{self.application_id}:{guild.id if guild else 'global'}"
+        try:
+            if not FORCE_COMMAND_SYNC and await db.get_setting(key) == digest:
+                logging.info("Command tree unchanged, skipped sync.")
+                return
+            synced = await self.tree.sync(guild=guild)
+            await db.set_setting(key, digest)
+            logging.info("Synced %d command(s) %s in %.2fs.", len(synced), f"to guild {guild.id}" if guild else "globally",
+                         time.perf_counter() - started)
+        except Exception as e:
+            logging.error("Failed to sync commands: %s", e)
+
+    async def restore_games(self):
+        now = time.time()
+        for game_id, kind, user_id, state, channel_id, message_id, expires_at in await db.load_games():
+            game = game_from_row(game_id, kind, user_id, state, channel_id, message_id)
+            if expires_at <= now or message_id is None:
+                await expire_game(game)
+                continue
+            self.games.add(game, expires_at)
+            self.add_view(GAME_VIEWS[kind](game), message_id=message_id)
+        logging.info("Restored %d active game(s).", len(self.games))
+
+    async def expire_games(self):
+        while True:
+            await asyncio.sleep(15)
+            for game in self.games.expire():
+                try:
+                    await expire_game(game)
+                except Exception:
+                    logging.exception("Failed to expire game %s", game.game_id)
+
+    async def on_ready(self):
+        print(f'Logged on as {self.user}')
+        if not self._ready_once:
+            self._ready_once = True
+            mark("gateway")
+            breakdown = ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in startup_times)
+            logging.info("Started in %.2fs: %s", sum(seconds for _, seconds in startup_times), breakdown)
+
+    async def close(self):
+        if self._expiry_task:
+            self._expiry_task.cancel()
+        if self._sync_task:
+            self._sync_task.cancel()
+        top_players.stop()
+        animation.stop()
+        limiter.stop()
+        watchdog.stop()
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+        await super().close()
+        await db.close()
+
+
+client = Client()
+
+
+def timed(kind):
+    def decorator(func):
+        label = f"{kind} {func.__name__}"
+
+        @functools.wraps(func)
+        async def attributed(*args, **kwargs):
+            watchdog.attribute(label)
+            db.note_activity()
+            return await func(*args, **kwargs)
+        return metrics.timed(HANDLER_SECONDS, kind, func.__name__)(attributed)
+    return decorator
+
+
+def rate_limited():
+    def predicate(interaction: discord.Interaction):
+        retry_after = limiter.hit(interaction.user.id, interaction.guild_id)
+        if retry_after:
+            raise app_commands.CommandOnCooldown(app_commands.Cooldown(limiter.rate, limiter.per), retry_after)
+        return True
+    return app_commands.check(predicate)
+
+
+async def reply_cooldown(interaction, retry_after):
+    message = f"🐢 Slow down! Try again in {retry_after:.1f}s."
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+
+@client.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.CommandOnCooldown):
+        await reply_cooldown(interaction, error.retry_after)
+        return
+    name = interaction.command.name if interaction.command else None
+    logging.error("Ignoring exception in command %r", name, exc_info=error)
+
+@client.tree.command(name="balance", description="Check your virtual currency balance")
+@rate_limited()
+@timed("command")
+async def balance(interaction: discord.Interaction):
+    user_id = str(interaction.user.id)
+    balance = await db.get_balance(user_id)
+    await interaction.response.defer(thinking=True)
+    await asyncio.sleep(0.5)
+    await interaction.followup.send(f"{interaction.user.name}, your balance is 💰 {balance}")
+
+
+
+def format_grid(grid):
+    return "```\n" + "\n".join([" | ".join(row) for row in grid]) + "\n```"
+
+
+async def save_game(game):
+    await db.save_game(game_to_row(game), int(client.games.expires_at(game.game_id) or time.time()))
+
+
+async def end_game(game):
+    client.games.pop(game.game_id)
+    if game.view:
+        game.view.stop()
+    await db.delete_game(game.game_id)
+
+
+async def reply_busy(interaction):
+    message = "⏳ Your last move is still being played, wait for it to finish."
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+
+def persistent_ids(view, kind, game_id):
+    # Buttons carry the game id so a restarted bot can route clicks on old messages.
+    for item in view.children:
+        item.custom_id = f"{kind}:{item.custom_id}:{game_id}"
+
+
+class SlotView(discord.ui.View):
+    def __init__(self, game):
+        super().__init__(timeout=None)
+        self.game = game
+        self.machine = MACHINES[game.machine]
+        self.message = None
+        game.view = self
+        persistent_ids(self, "slots", game.game_id)
+
+    def freeze(self):
+        for item in self.children:
+            item.disabled = True
+
+    def unfreeze(self):
+        for item in self.children:
+            item.disabled = False
+
+    async def interaction_check(self, interaction_button: discord.Interaction):
+        retry_after = limiter.hit(interaction_button.user.id, interaction_button.guild_id)
+        if retry_after:
+            await reply_cooldown(interaction_button, retry_after)
+            return False
+        if client.games.get(self.game.game_id) is None:
+            await interaction_button.response.send_message("This game has ended.", ephemeral=True)
+            return False
+        if interaction_button.user.id != self.game.user_id:
+            await interaction_button.response.send_message("This isn't your game!", ephemeral=True)
+            return False
+        if self.message is None:
+            self.message = interaction_button.message
+        return True
+
+    @discord.ui.button(label="⬆ Increase Bet", style=discord.ButtonStyle.secondary, custom_id="increase")
+    @timed("button")
+    async def increase_bet(self, interaction_button: discord.Interaction, button: discord.ui.Button):
+        with game_locks.claim(self.game.user_id) as claimed:
+            if not claimed:
+                await reply_busy(interaction_button)
+                return
+            if self.game.bet + 1 <= await db.get_balance(self.game.user_id):
+                self.game.bet += 1
+                await interaction_button.response.defer()
+                await save_game(self.game)
+                await edits.edit(self.message, content=f"🎲 Bet increased to {self.game.bet}", view=self)
+            else:
+                await interaction_button.response.send_message("Not enough balance to increase bet!", ephemeral=True)
+
+    @discord.ui.button(label="⬇ Decrease Bet", style=discord.ButtonStyle.secondary, custom_id="decrease")
+    @timed("button")
+    async def decrease_bet(self, interaction_button: discord.Interaction, button: discord.ui.Button):
+        with game_locks.claim(self.game.user_id) as claimed:
+            if not claimed:
+                await reply_busy(interaction_button)
+                return
+            if self.game.bet > 1:
+                self.game.bet -= 1
+                await interaction_button.response.defer()
+                await save_game(self.game)
+                await edits.edit(self.message, content=f"🎲 Bet decreased to {self.game.bet}", view=self)
+            else:
+                await interaction_button.response.send_message("Minimum bet is 1!", ephemeral=True)
+
+    @discord.ui.button(label="Spin Again 🎰", style=discord.ButtonStyle.success, custom_id="spin")
+    @timed("button")
+    async def spin_again(self, interaction_button: discord.Interaction, button: discord.ui.Button):
+        await self.spin(interaction_button)
+
+    @discord.ui.button(label="Stop 🚫", style=discord.ButtonStyle.danger, custom_id="stop")
+    @timed("button")
+    async def stop_game(self, interaction_button: discord.Interaction, button: discord.ui.Button):
+        # A spin in flight would re-enable the buttons when it finishes.
+        with game_locks.claim(self.game.user_id) as claimed:
+            if not claimed:
+                await reply_busy(interaction_button)
+                return
+            await end_game(self.game)
+            self.freeze()
+            await interaction_button.response.edit_message(content="🎰 Game ended.", view=self)
+
+    async def animate_vertical_spin(self, final_symbols, bet):
+        rows, columns = self.machine.rows, self.machine.reels
+
+        for i, step in enumerate(animation.frames(range(columns + 1))):
+            grid = []
+
+            for row in range(rows):
+                current_row = []
+                for col in range(columns):
+                    if step > col:
+                        current_row.append(final_symbols[row][col])
+                    else:
+                        current_row.append(self.machine.random_symbol())
+                grid.append(current_row)
+
+            content = f"🎰 Spinning...\n{format_grid(grid)}\n🎲 Current Bet: {bet}"
+            if i == 0:
+                await edits.edit(self.message, content=content, view=self)
+            else:
+                edits.submit(self.message, content=content)
+            await asyncio.sleep(0.4)
+
+    async def spin(self, interaction_obj):
+        with game_locks.claim(self.game.user_id) as claimed:
+            if not claimed:
+                await reply_busy(interaction_obj)
+                return
+            await self.play_spin(interaction_obj)
+
+    async def play_spin(self, interaction_obj):
+        game = self.game
+        # Settle at the stake actually wagered, whatever happens to game.bet.
+        bet = game.bet
+        if await db.place_wager(game.user_id, "slots", bet) is None:
+            if interaction_obj.response.is_done():
+                await interaction_obj.followup.send("❌ You don't have enough coins to spin again!", ephemeral=True)
+            else:
+                await interaction_obj.response.send_message("❌ You don't have enough coins to spin again!", ephemeral=True)
+            if self.message:
+                await end_game(game)
+                self.freeze()
+                await edits.edit(self.message, view=self)
+            return
+        WAGERED.inc("slots", amount=bet)
+        # The outcome is settled before anything is sent, so a failed defer,
+        # send or animation frame can't leave the stake taken but unpaid.
+        final = self.machine.spin()
+        winnings = self.machine.payout(final, bet)
+        final_grid = self.machine.render(final)
+        new_balance = await db.settle_wager(game.user_id, "slots", bet, winnings, final_grid)
+
+        if not interaction_obj.response.is_done():
+            await interaction_obj.response.defer()
+        if not self.message:
+            self.message = await interaction_obj.followup.send("🎰 Spinning...")
+            game.channel_id, game.message_id = self.message.channel.id, self.message.id
+            await save_game(game)
+
+        self.freeze()
+        with animation.playing():
+            await self.animate_vertical_spin(final_grid, bet)
+        result_text = (
+            f"🎰 Final Result!\n{format_grid(final_grid)}\n"
+            f"You {'won' if winnings > 0 else 'lost'} {abs(winnings - bet)} coins!\n"
+            f"New balance: 💰 {new_balance}\n"
+            f"🎲 Current Bet: {bet}"
+        )
+
+        self.unfreeze()
+        await edits.edit(self.message, content=result_text, view=self)
+
+
+@client.tree.command(name="slots", description="Play a slot machine with a bet")
+@rate_limited()
+@app_commands.choices(machine=[app_commands.Choice(name=name, value=name) for name in MACHINES])
+@timed("command")
+async def slots(interaction: discord.Interaction, bet: int, machine: str = "classic"):
+    user_id = str(interaction.user.id)
+
+    if bet <= 0:
+        await interaction.response.send_message("Invalid bet amount.")
+        return
+
+    balance = await db.get_balance(user_id)
+    if bet > balance:
+        await interaction.response.send_message("You don't have enough balance to bet that amount.")
+        return
+
+    game = SlotGame(new_game_id(), interaction.user.id, bet, machine)
+    client.games.add(game)
+    view = SlotView(game)
+    await view.spin(interaction)
+
+
+LEADERBOARD_PAGE_SIZE = 5
+
+
+async def leaderboard_embed(rows, page):
+    embed = discord.Embed(
+        title="🏆 Leaderboard — Top Richest Players",
+        description="Here are the top 5 users with the highest balance!" if page == 1 else f"Page {page}",
+        color=discord.Color.red()
+    )
+
+    names = await user_names.resolve(client, [int(user_id) for user_id, _ in rows])
+    start = (page - 1) * LEADERBOARD_PAGE_SIZE + 1
+    for i, (user_id, balance) in enumerate(rows, start=start):
+        name = names.get(int(user_id))
+        embed.add_field(
+            name=f"{i}. {name}" if name else f"{i}. Unknown User ({user_id})",
+            value=f"💰 {balance} coins",
+            inline=False
+        )
+    return embed
+
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, owner_id, rows):
+        super().__init__(timeout=120)
+        self.owner_id = owner_id
+        self.rows = rows
+        self.page = 1
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 1
+        self.next_page.disabled = len(self.rows) < LEADERBOARD_PAGE_SIZE
+
+    async def show(self, interaction_button, rows, page):
+        if not rows:
+            self.next_page.disabled = True
+            await interaction_button.response.edit_message(view=self)
+            return
+        self.rows = rows
+        self.page = page
+        self.update_buttons()
+        await interaction_button.response.edit_message(embed=await leaderboard_embed(rows, page), view=self)
+
+    async def interaction_check(self, interaction_button: discord.Interaction):
+        if interaction_button.user.id != self.owner_id:
+            await interaction_button.response.send_message("Run /leaderboard to browse the pages yourself.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    @timed("button")
+    async def previous_page(self, interaction_button: discord.Interaction, button: discord.ui.Button):
+        user_id, balance = self.rows[0]
+        rows = await db.leaderboard_page(LEADERBOARD_PAGE_SIZE, before=(balance, user_id))
+        await self.show(interaction_button, rows, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    @timed("button")
+    async def next_page(self, interaction_button: discord.Interaction, button: discord.ui.Button):
+        user_id, balance = self.rows[-1]
+        rows = await db.leaderboard_page(LEADERBOARD_PAGE_SIZE, after=(balance, user_id))
+        await self.show(interaction_button, rows, self.page + 1)
+
+
+@client.tree.command(name="leaderboard", description="Show the top users with the most virtual currency")
+@rate_limited()
+@timed("command")
+async def leaderboard(interaction: discord.Interaction):
+    rows = await top_players.top(LEADERBOARD_PAGE_SIZE)
+
+    if not rows:
+        await interaction.response.send_message("No currency data available yet.")
+        return
+
+    view = LeaderboardView(interaction.user.id, rows)
+    await interaction.response.send_message(embed=await leaderboard_embed(rows, 1), view=view)
+
+
+@client.tree.command(name="rank", description="See where you or another player stand on the leaderboard")
+@rate_limited()
+@timed("command")
+async def rank(interaction: discord.Interaction, user: discord.User = None):
+    target = user or interaction.user
+    position, balance = await db.get_rank(target.id)
+    if position is None:
+        await interaction.response.send_message(f"{target.name} hasn't played any games yet!", ephemeral=True)
+        return
+    await interaction.response.send_message(f"🏅 {target.name} is ranked **#{position}** with 💰 {balance} coins.")
+
+
+def profile_embed(target, profile):
+    (games, wins, losses, total_earned, largest_win,
+     blackjack_wins, blackjack_losses, blackjack_total_earned, blackjack_largest_win,
+     balance, favourite_symbol) = profile
+    win_rate = (wins / games * 100) if games > 0 else 0
+
+    common_symbol_text = favourite_symbol or "N/A"
+
+    embed = discord.Embed(
+        title=f"{target.name}'s Game Stats 🎮",
+        color=discord.Color.gold()
+    )
+    embed.set_thumbnail(url=target.display_avatar.url)
+
+    
+    embed.add_field(name="💰 Balance", value=str(balance), inline=True)
+    embed.add_field(name="🎮 Games Played", value=str(games), inline=True)
+    embed.add_field(name="✅ Wins", value=str(wins), inline=True)
+    embed.add_field(name="❌ Losses", value=str(losses), inline=True)
+    embed.add_field(name="📈 Win Rate", value=f"{win_rate:.2f}%", inline=True)
+    embed.add_field(name="💸 Total Earned", value=str(total_earned), inline=True)
+    embed.add_field(name="⭐ Most Common Symbol", value=common_symbol_text, inline=True)
+    embed.add_field(name="🏆 Largest Win", value=str(largest_win), inline=True)
+
+    embed.add_field(name="\u200b", value="\u200b", inline=False)  
+
+   
+    embed.add_field(name="♠️ Blackjack Wins", value=str(blackjack_wins), inline=True)
+    embed.add_field(name="♦️ Blackjack Losses", value=str(blackjack_losses), inline=True)
+    embed.add_field(name="💵 Blackjack Total Earned", value=str(blackjack_total_earned), inline=True)
+    embed.add_field(name="🎯 Blackjack Largest Win", value=str(blackjack_largest_win), inline=True)
+    return embed
+
+
+@client.tree.command(name="profile", description="View your game stats and balance")
+@rate_limited()
+@timed("command")
+async def profile(interaction: discord.Interaction, user: discord.User = None):
+    target = user or interaction.user
+    uid = target.id
+
+    embed = profile_cache.get(uid)
+    if embed is None:
+        profile_cache.begin(uid)
+        try:
+            stats = (await db.get_profiles([uid])).get(uid)
+            embed = profile_embed(target, stats) if stats else None
+        finally:
+            profile_cache.finish(uid, embed)
+
+    if embed is None:
+        await interaction.response.send_message(f"{target.name} hasn't played any games yet!", ephemeral=True)
+        return
+
+    await interaction.response.send_message(embed=embed)
+
+
+PROFILES_LIMIT = 25
+
+
+async def guild_members(guild):
+    """Loads the full member list the first time a guild needs it; until
+    then the cache only holds members seen in events."""
+    if not guild.chunked:
+        await guild.chunk()
+    return guild.members
+
+
+async def refuse_without_members(interaction):
+    """Without MEMBERS_INTENT only members seen in events are cached, so role
+    and server-wide targets are refused rather than run on part of them."""
+    if MEMBERS_INTENT:
+        return False
+    await interaction.response.send_message("That needs the server's member list, which this bot runs without. "
+                                            "Pick players individually instead.", ephemeral=True)
+    return True
+
+
+def mentioned_ids(text):
+    return {int(user_id) for user_id in re.findall(r"<@!?(\d+)>", text or "")}
+
+
+@client.tree.command(name="profiles", description="Compare the stats of a role or several mentioned players")
+@rate_limited()
+@timed("command")
+async def profiles(interaction: discord.Interaction, role: discord.Role = None, users: str = None):
+    user_ids = mentioned_ids(users)
+    if not user_ids and role is None:
+        await interaction.response.send_message("Mention some players or pick a role.", ephemeral=True)
+        return
+    if role is not None and await refuse_without_members(interaction):
+        return
+
+    await interaction.response.defer()
+    if role is not None:
+        await guild_members(role.guild)
+        user_ids.update(member.id for member in role.members)
+    stats = await db.get_profiles(user_ids)
+    ranked = sorted(stats.items(), key=lambda item: item[1][9], reverse=True)[:PROFILES_LIMIT]
+    names = await user_names.resolve(client, [user_id for user_id, _ in ranked])
+
+    title = f"🎮 {role.name} Stats" if role is not None else "🎮 Player Stats"
+    embed = discord.Embed(title=title, color=discord.Color.gold())
+    for user_id, (games, wins, losses, total_earned, largest_win, blackjack_wins, blackjack_losses, *_, balance, _) in ranked:
+        win_rate = (wins / games * 100) if games > 0 else 0
+        embed.add_field(
+            name=names.get(user_id) or f"Unknown User ({user_id})",
+            value=f"💰 {balance} · 🎮 {games} games · 📈 {win_rate:.1f}%\n♠️ {blackjack_wins}W / {blackjack_losses}L",
+            inline=True
+        )
+    missing = len(user_ids) - len(stats)
+    if missing or len(stats) > PROFILES_LIMIT:
+        embed.set_footer(text=f"Showing {len(ranked)} of {len(stats)} players with stats; {missing} haven't played yet.")
+    await interaction.followup.send(embed=embed)
+
+
+
+
+
+@client.tree.command(name="tos", description="Get a link to terms of service")
+@timed("command")
+async def tos(interactiom: discord.Interaction):
+    await interactiom.user.send("https://gist.github.com/korolbbichey/ec9757512835365e37c3c8823d096ccb")
+
+@client.tree.command(name="help", description="Get a list of all available commands in a private message")
+@timed("command")
+async def help_command(interaction: discord.Interaction):
+    help_text = """
+📖 **Bankroll Command List**
+
+```
+/balance              - Check your virtual coin balance
+/slots <bet>          - Play a slot machine game with your bet
+/leaderboard          - View the top 5 richest players
+/rank [@user]         - See your position on the leaderboard
+/profile [@user]      - View your own or someone else's stats
+/profiles [role]      - Compare the stats of a role or mentioned players
+/daily_reward         - Claim daily reward(Updates every day)
+/challenges           - View your daily and weekly win progress
+/export_history       - Download your wager and payout history
+/blackjack            - Play a blackjack game with your bet
+/tos                  - View the Terms of Service 
+💡 Need help? Contact the dev or visit the support server! ```
+"""
+    try:
+        await interaction.user.send(help_text)
+        await interaction.response.send_message("✅ Help has been sent to your DMs!", ephemeral=True)
+    except discord.Forbidden:
+        await interaction.response.send_message("❌ I couldn't send you a DM. Please check your privacy settings!", ephemeral=True)
+        
+@client.tree.command(name="add_balance", description="Manually add virtual currency to a player's balance")
+@rate_limited()
+@timed("command")
+async def add_balance(interaction: discord.Interaction, user: discord.User, amount: int):
+    
+    if amount <= 0:
+        await interaction.response.send_message("Amount must be positive!", ephemeral=True)
+        return
+
+    
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
+        return
+
+    user_id = user.id
+
+    new_balance = await db.add_balance(user_id, amount)
+
+    await interaction.response.send_message(f"Successfully added 💰 {amount} to {user.name}'s balance. New balance: 💰 {new_balance}")
+    
+@client.tree.command(name="bulk_balance", description="Grant or deduct virtual currency for a role, mentioned players or everyone")
+@rate_limited()
+@timed("command")
+async def bulk_balance(interaction: discord.Interaction, action: Literal["grant", "deduct"], amount: int,
+                       role: discord.Role = None, users: str = None, everyone: bool = False, dry_run: bool = False):
+    if amount <= 0:
+        await interaction.response.send_message("Amount must be positive!", ephemeral=True)
+        return
+
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
+        return
+
+    user_ids = None if everyone else mentioned_ids(users)
+    if user_ids is not None and not user_ids and role is None:
+        await interaction.response.send_message("Mention some players, pick a role or choose everyone.", ephemeral=True)
+        return
+    if not everyone and role is not None and await refuse_without_members(interaction):
+        return
+
+    await interaction.response.defer(ephemeral=dry_run)
+    if everyone:
+        target = "everyone"
+    else:
+        target = f"{len(user_ids)} mentioned"
+        if role is not None:
+            await guild_members(role.guild)
+            user_ids.update(member.id for member in role.members)
+            target = f"role {role.name} and {target}" if users else f"role {role.name}"
+        if not user_ids:
+            await interaction.followup.send(f"Nobody has the role {role.name}.")
+            return
+    batch_id, status, count, total = await db.bulk_adjust(action, amount, user_ids, target, interaction.user.id, dry_run)
+    if status == "dry_run":
+        await interaction.followup.send(f"Dry run: would {action} 💰 {abs(total)} across {count} players ({target}). Nothing was changed.")
+        return
+    verb = "Granted" if action == "grant" else "Deducted"
+    await interaction.followup.send(f"{verb} 💰 {abs(total)} across {count} players ({target}). Batch `{batch_id}`, undo with /undo_batch.")
+
+
+@client.tree.command(name="undo_batch", description="Reverse a bulk balance change by its batch id")
+@rate_limited()
+@timed("command")
+async def undo_batch(interaction: discord.Interaction, batch_id: str):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
+        return
+
+    await interaction.response.defer()
+    undo_id, status, count, total = await db.undo_batch(batch_id.strip(), interaction.user.id)
+    if status == "missing":
+        await interaction.followup.send(f"No bulk change with batch id `{batch_id}`.")
+    elif status == "already_undone":
+        await interaction.followup.send(f"Batch `{batch_id}` has already been undone.")
+    elif status == "archived":
+        await interaction.followup.send(f"Batch `{batch_id}` is too old to undo; its ledger entries have been archived.")
+    else:
+        await interaction.followup.send(f"Undid batch `{batch_id}`: moved 💰 {total:+} across {count} players (batch `{undo_id}`).")
+
+
+@client.tree.command(name="export_history", description="Download the wager and payout history of a player or the whole server")
+@rate_limited()
+@timed("command")
+async def export_history(interaction: discord.Interaction, user: discord.User = None, whole_server: bool = False):
+    target = user or interaction.user
+    if (whole_server or target.id != interaction.user.id) and not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("You can only export your own history.", ephemeral=True)
+        return
+    if whole_server and await refuse_without_members(interaction):
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    if whole_server:
+        user_ids = [member.id for member in await guild_members(interaction.guild)]
+        filename = f"ledger-{interaction.guild.id}.jsonl.gz"
+    else:
+        user_ids = [target.id]
+        filename = f"ledger-{target.id}.jsonl.gz"
+    limit = interaction.guild.filesize_limit if interaction.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+    with tempfile.TemporaryFile() as out:
+        rows = await db.export_history(user_ids, out)
+        if out.tell() > limit:
+            await interaction.followup.send(f"The export of {rows} entries is too large to upload here; run `python archive.py export` on the host instead.", ephemeral=True)
+            return
+        out.seek(0)
+        await interaction.followup.send(f"📜 {rows} ledger entries.", file=discord.File(out, filename=filename), ephemeral=True)
+
+@client.tree.command(name="daily_reward", description="Claim your daily reward")
+@rate_limited()
+@timed("command")
+async def daily_reward(interaction: discord.Interaction):
+    user_id = str(interaction.user.id)
+    today = datetime.today().date()
+    reward = 50
+
+    status, new_balance = await db.claim_daily_reward(user_id, reward, today)
+
+    if status == "already_claimed":
+        await interaction.response.send_message("You’ve already claimed your daily reward today. Try again tomorrow!", ephemeral=True)
+        return
+    if status == "new":
+        await interaction.response.send_message(f"You've been initialized and received your first daily reward of 💰 {reward}!")
+        return
+
+    await interaction.response.send_message(f"✅ You've claimed your daily reward of 💰 {reward}! Your new balance is 💰 {new_balance}.", ephemeral=True)
+    
+@client.tree.command(name="challenges", description="See your daily and weekly win progress")
+@rate_limited()
+@timed("command")
+async def challenges(interaction: discord.Interaction):
+    daily_wins, weekly_wins = await db.get_challenges(interaction.user.id)
+
+    tomorrow = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    next_week = tomorrow + timedelta(days=(7 - tomorrow.weekday()) % 7)
+
+    embed = discord.Embed(title=f"🎯 {interaction.user.name}'s Challenges", color=discord.Color.blue())
+    embed.add_field(name="📅 Daily Wins", value=f"{daily_wins}\nResets <t:{int(tomorrow.timestamp())}:R>", inline=True)
+    embed.add_field(name="🗓️ Weekly Wins", value=f"{weekly_wins}\nResets <t:{int(next_week.timestamp())}:R>", inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+def format_hand(hand, hide_second=False):
+    return " ".join(['🂠' if i == 1 and hide_second else f"`{card}`" for i, card in enumerate(hand.labels())])
+
+
+def blackjack_end_embed(game, outcome, winnings):
+    embed = discord.Embed(title=f"🎲 {outcome}", color=discord.Color.gold())
+    embed.add_field(name="Your Hand", value=f"{format_hand(game.player)} ({game.player.value})", inline=False)
+    embed.add_field(name="Dealer's Hand", value=f"{format_hand(game.dealer)} ({game.dealer.value})", inline=False)
+    embed.add_field(name="💰 Result", value=f"You {'won' if winnings > 0 else 'lost'} {abs(winnings)} coins", inline=False)
+    return embed
+
+
+async def finish_blackjack(game):
+    client.games.pop(game.game_id)
+    blackjack_engine.dealer_play(game.dealer, shoe)
+
+    result = blackjack_engine.settle(game.player, game.dealer)
+    if result == blackjack_engine.WIN:
+        outcome = "🏆 You Win!"
+        winnings = game.bet
+    elif result == blackjack_engine.PUSH:
+        outcome = "🤝 It's a Tie!"
+        winnings = 0
+    else:
+        outcome = "😢 You Lose!"
+        winnings = -game.bet
+
+    await db.settle_wager(game.user_id, "blackjack", game.bet, game.bet * blackjack_engine.PAYOUTS[result])
+    await end_game(game)
+    return outcome, winnings
+
+
+class BlackjackView(discord.ui.View):
+    def __init__(self, game):
+        super().__init__(timeout=None)
+        self.game = game
+        self.message = None
+        game.view = self
+        persistent_ids(self, "blackjack", game.game_id)
+
+    async def update_message(self, interaction, hide_dealer=True, footer="Choose an action."):
+        embed = discord.Embed(title="🃏 Blackjack", color=discord.Color.dark_green())
+        embed.add_field(name="Your Hand", value=f"{format_hand(self.game.player)} ({self.game.player.value})", inline=False)
+        embed.add_field(name="Dealer's Hand", value=format_hand(self.game.dealer, hide_second=hide_dealer), inline=False)
+        embed.set_footer(text=footer)
+        if self.message:
+            await edits.edit(self.message, embed=embed, view=self)
+        else:
+            self.message = await interaction.followup.send(embed=embed, view=self)
+
+    def disable_all(self):
+        for item in self.children:
+            item.disabled = True
+
+    async def interaction_check(self, interaction_button: discord.Interaction):
+        retry_after = limiter.hit(interaction_button.user.id, interaction_button.guild_id)
+        if retry_after:
+            await reply_cooldown(interaction_button, retry_after)
+            return False
+        if client.games.get(self.game.game_id) is None:
+            await interaction_button.response.send_message("Game has already ended.", ephemeral=True)
+            return False
+        if interaction_button.user.id != self.game.user_id:
+            await interaction_button.response.send_message("This isn't your game!", ephemeral=True)
+            return False
+        if self.message is None:
+            self.message = interaction_button.message
+        return True
+
+    @discord.ui.button(label="🃏 Hit", style=discord.ButtonStyle.primary, custom_id="hit")
+    @timed("button")
+    async def hit(self, interaction_button: discord.Interaction, _):
+        game = self.game
+        with game_locks.claim(game.user_id) as claimed:
+            if not claimed:
+                return await reply_busy(interaction_button)
+            game.player.add(shoe.draw())
+            if game.player.busted:
+                client.games.pop(game.game_id)
+                await db.settle_wager(game.user_id, "blackjack", game.bet, 0)
+                await end_game(game)
+                self.disable_all()
+                await interaction_button.response.edit_message(embed=blackjack_end_embed(game, "💥 You Busted!", -game.bet), view=self)
+            else:
+                await interaction_button.response.defer()
+                await save_game(game)
+                await self.update_message(interaction_button)
+
+    @discord.ui.button(label="✋ Stand", style=discord.ButtonStyle.secondary, custom_id="stand")
+    @timed("button")
+    async def stand(self, interaction_button: discord.Interaction, _):
+        with game_locks.claim(self.game.user_id) as claimed:
+            if not claimed:
+                return await reply_busy(interaction_button)
+            outcome, winnings = await finish_blackjack(self.game)
+            self.disable_all()
+            await interaction_button.response.edit_message(embed=blackjack_end_embed(self.game, outcome, winnings), view=self)
+
+
+GAME_VIEWS = {SlotGame.kind: SlotView, BlackjackGame.kind: BlackjackView}
+
+
+async def expire_game(game):
+    """Ends a game nobody has touched within the registry's TTL. An open
+    blackjack hand stands, so the wager taken up front is always settled."""
+    if game.kind == BlackjackGame.kind:
+        outcome, winnings = await finish_blackjack(game)
+        changes = {"embed": blackjack_end_embed(game, outcome, winnings), "view": None}
+    else:
+        await end_game(game)
+        changes = {"view": None}
+
+    if game.channel_id and game.message_id:
+        message = client.get_partial_messageable(game.channel_id).get_partial_message(game.message_id)
+        try:
+            await edits.edit(message, **changes)
+        except discord.HTTPException:
+            pass
+
+
+@client.tree.command(name="blackjack", description="Play a game of Blackjack with a bet")
+@rate_limited()
+@timed("command")
+async def blackjack(interaction: discord.Interaction, bet: int):
+    user_id = str(interaction.user.id)
+    if bet <= 0:
+        await interaction.response.send_message("⚠️ Bet must be greater than zero.", ephemeral=True)
+        return
+
+    with game_locks.claim(interaction.user.id) as claimed:
+        if not claimed:
+            await reply_busy(interaction)
+            return
+
+        if await db.place_wager(user_id, "blackjack", bet) is None:
+            await interaction.response.send_message("❌ You don't have enough balance to bet that amount.", ephemeral=True)
+            return
+        WAGERED.inc("blackjack", amount=bet)
+
+        player_hand, dealer_hand = blackjack_engine.deal(shoe)
+        game = BlackjackGame(new_game_id(), interaction.user.id, bet, player_hand, dealer_hand)
+        client.games.add(game)
+
+        await interaction.response.defer()
+        view = BlackjackView(game)
+        await view.update_message(interaction)
+        game.channel_id, game.message_id = view.message.channel.id, view.message.id
+        await save_game(game)
+
+@client.tree.command(name="coinflip", description="Flip a coin and win double your bet if you guess right!")
+@rate_limited()
+@timed("command")
+async def coinflip(interaction: discord.Interaction, guess: str, bet: int):
+    user_id = str(interaction.user.id)
+    guess = guess.lower()
+
+    if guess not in ["heads", "tails"]:
+        await interaction.response.send_message("Please choose either 'heads' or 'tails'.", ephemeral=True)
+        return
+
+    if bet <= 0:
+        await interaction.response.send_message("Your bet must be greater than 0.", ephemeral=True)
+        return
+
+    with game_locks.claim(interaction.user.id) as claimed:
+        if not claimed:
+            await reply_busy(interaction)
+            return
+        await flip_coin(interaction, user_id, guess, bet)
+
+
+async def flip_coin(interaction, user_id, guess, bet):
+    if await db.place_wager(user_id, "coinflip", bet) is None:
+        await interaction.response.send_message("You don't have enough coins for that bet.", ephemeral=True)
+        return
+    WAGERED.inc("coinflip", amount=bet)
+    # Settled before anything is sent, as in SlotView.play_spin.
+    outcome = random.choice(["heads", "tails"])
+    win = guess == outcome
+    winnings = bet * 2 if win else 0
+    new_balance = await db.settle_wager(user_id, "coinflip", bet, winnings)
+
+    
+    embed = discord.Embed(
+        title="🪙 Coin Flip!",
+        description="Flipping the coin...",
+        color=discord.Color.random()
+    )
+    embed.set_footer(text="You guessed: " + guess.capitalize())
+    message = await interaction.response.send_message(embed=embed)
+    message = await interaction.original_response()
+
+    
+    flip_sequence = ["Heads 🟤", "Tails ⚪", "Heads 🟤", "Tails ⚪", "Heads 🟤", "Tails ⚪"]
+    with animation.playing():
+        for flip in animation.frames(flip_sequence):
+            embed.description = f"Flipping the coin...\n**{flip}**"
+            edits.submit(message, embed=embed)
+            await asyncio.sleep(0.5)
+
+    
+    emoji = "🟤" if outcome == "heads" else "⚪"
+    if win:
+        result = f"🎉 It landed on **{outcome.capitalize()} {emoji}**!\nYou win **{bet}** coins!"
+    else:
+        result = f"😢 It landed on **{outcome.capitalize()} {emoji}**!\nYou lost **{bet}** coins."
+
+    
+    embed.title = "🪙 Coin Flip Result"
+    embed.description = result + f"\n\n💰 New Balance: **{new_balance}**"
+    embed.color = discord.Color.green() if win else discord.Color.red()
+
+    await edits.edit(message, embed=embed)
+
+
+mark("imports")
+
+
+def main():
+    bot_token = os.getenv("DISCORD_BOT_TOKEN")
+    if not bot_token:
+        raise ValueError("Bot token not found in .env file. Check the file path and variable name.")
+
+    logging.info("Bot token loaded successfully.")
+    logging.info("Database at schema version %d", db.migrate())
+    mark("migrate")
+    client.run(bot_token)
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,191 @@
+import functools
+import logging
+import re
+import time
+
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Collected:
+    """A gauge or counter read from ``collect`` at scrape time, for values
+    another component already tracks. ``collect`` returns a number, or a
+    dict of label tuples to numbers when there are labels."""
+
+    def __init__(self, name, help, kind, collect, labelnames=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        value = self.collect()
+        if not self.labelnames:
+            yield self.name, "", value
+            return
+        for labels, sample in value.items():
+            yield self.name, _labels(self.labelnames, labels), sample
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", _labels(self.labelnames, labels, [("le", _number(bound))]), cumulative
+            yield f"{self.name}_bucket", _labels(self.labelnames, labels, [("le", "+Inf")]), count
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, collect, labelnames=()):
+        return self.register(Collected(name, help, "gauge", collect, labelnames))
+
+    def collected_counter(self, name, help, collect, labelnames=()):
+        return self.register(Collected(name, help, "counter", collect, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, labels, value in metric.samples():
+                    lines.append(f"{name}{labels} {_number(value)}")
+            except Exception:
+                log.exception("Failed to collect %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram, *labels):
+    """Decorates a coroutine function so each call's duration is observed
+    in ``histogram``, whether it returns or raises."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, *labels)
+        return wrapper
+    return decorator
+
+
+def route(path):
+    """Collapses ids and interaction tokens so a Discord API path can be used
+    as a label, e.g. ``/webhooks/:id/:token/messages/:id``."""
+    parts = re.sub(r"^/api/v\d+", "", path).split("/")
+    for i, part in enumerate(parts):
+        if part.isdigit():
+            parts[i] = ":id"
+        elif i >= 2 and parts[i - 2] in ("webhooks", "interactions"):
+            parts[i] = ":token"
+    return "/".join(parts)
+
+
+def http_trace(requests, on_rate_limited=None):
+    """An aiohttp trace config that counts every Discord API request in
+    ``requests``, labelled by method, route and status. ``on_rate_limited``
+    is called with the method and route of every 429, which discord.py
+    otherwise retries without telling anyone."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_end(session, context, params):
+        path = route(params.url.path)
+        requests.inc(params.method, path, str(params.response.status))
+        if on_rate_limited is not None and params.response.status == 429:
+            on_rate_limited(params.method, path)
+
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+
+async def serve(registry, host="127.0.0.1", port=9108):
+    # aiohttp.web is only needed when the endpoint is enabled.
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(body=registry.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return runner
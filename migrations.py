@@ -0,0 +1,187 @@
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+def create_base_tables(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS currency (
+        user_id INTEGER PRIMARY KEY,
+        balance INTEGER DEFAULT 100
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS stats (
+        user_id INTEGER PRIMARY KEY,
+        games_played INTEGER DEFAULT 0,
+        wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0,
+        total_earned INTEGER DEFAULT 0,
+        most_common_symbol TEXT DEFAULT '',
+        largest_win INTEGER DEFAULT 0
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS challenges (
+        user_id INTEGER PRIMARY KEY,
+        daily_wins INTEGER DEFAULT 0,
+        weekly_wins INTEGER DEFAULT 0
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS blackjack_stats (
+        user_id INTEGER PRIMARY KEY,
+        blackjack_wins INTEGER DEFAULT 0,
+        blackjack_losses INTEGER DEFAULT 0,
+        blackjack_total_earned INTEGER DEFAULT 0,
+        blackjack_largest_win INTEGER DEFAULT 0
+    )''')
+
+
+def create_ledger(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ledger (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        game TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        balance_after INTEGER NOT NULL,
+        created_at INTEGER NOT NULL
+    )''')
+
+
+def columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+
+def add_column(cursor, table, definition):
+    if definition.split()[0] not in columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+
+def add_claim_date(cursor):
+    # Older databases may already have it from when daily_reward added it lazily.
+    add_column(cursor, "currency", "last_claim_date TEXT")
+
+
+def add_challenge_reset_columns(cursor):
+    add_column(cursor, "challenges", "last_daily_reset INTEGER DEFAULT 0")
+    add_column(cursor, "challenges", "last_weekly_reset INTEGER DEFAULT 0")
+
+
+def add_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_currency_balance ON currency (balance DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ledger_user ON ledger (user_id, id)")
+
+
+def create_symbol_counts(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS symbol_counts (
+        user_id INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, symbol)
+    ) WITHOUT ROWID''')
+
+
+def create_challenge_progress(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS challenge_progress (
+        user_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        wins INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, period, bucket)
+    ) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_challenge_bucket ON challenge_progress (period, bucket)")
+
+
+def create_games(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS games (
+        game_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        channel_id INTEGER,
+        message_id INTEGER,
+        expires_at INTEGER NOT NULL
+    )''')
+
+
+def create_settings(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )''')
+
+
+def create_admin_batches(cursor):
+    add_column(cursor, "ledger", "batch_id TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ledger_batch ON ledger (batch_id, user_id) WHERE batch_id IS NOT NULL")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS admin_batches (
+        batch_id TEXT PRIMARY KEY,
+        action TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        target TEXT NOT NULL,
+        actor_id INTEGER,
+        users INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        created_at INTEGER NOT NULL,
+        undone_by TEXT
+    )''')
+
+
+def create_ledger_daily(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ledger_daily (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        game TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        entries INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        PRIMARY KEY (user_id, day, game, kind)
+    ) WITHOUT ROWID''')
+
+
+MIGRATIONS = [
+    (1, "base tables", create_base_tables),
+    (2, "ledger", create_ledger),
+    (3, "currency.last_claim_date", add_claim_date),
+    (4, "challenge reset columns", add_challenge_reset_columns),
+    (5, "balance and ledger indexes", add_indexes),
+    (6, "symbol_counts", create_symbol_counts),
+    (7, "challenge_progress", create_challenge_progress),
+    (8, "games", create_games),
+    (9, "settings", create_settings),
+    (10, "admin batches", create_admin_batches),
+    (11, "ledger_daily", create_ledger_daily),
+]
+
+
+def current_version(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at INTEGER NOT NULL
+    )''')
+    return cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Applies every pending migration in one transaction, so a fresh
+    database is created with a single commit, and returns the resulting
+    schema version."""
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        version = current_version(cursor)
+        applied = []
+        for number, name, apply in MIGRATIONS:
+            if number <= version:
+                continue
+            apply(cursor)
+            cursor.execute("INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)", (number, name, int(time.time())))
+            applied.append((number, name))
+            version = number
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    for number, name in applied:
+        log.info("Applied migration %d: %s", number, name)
+    return version
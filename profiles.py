@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+
+
+class ProfileCache:
+    """Rendered profile embeds by user id, dropped as soon as that user's
+    balance or stats change, and after ``ttl`` seconds so name and avatar
+    changes show up too.
+
+    A render that was in flight when the user changed is not stored, so a
+    stale embed can't replace the invalidated one."""
+
+    def __init__(self, ttl=300, max_size=5_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._embeds = OrderedDict()
+        self._rendering = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._embeds)
+
+    def get(self, user_id):
+        entry = self._embeds.get(user_id)
+        if entry is None or entry[1] <= self.clock():
+            self.misses += 1
+            return None
+        self._embeds.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def begin(self, user_id):
+        """Marks a render of ``user_id`` as in flight. Every ``begin`` must be
+        followed by ``finish``."""
+        self._rendering.setdefault(user_id, False)
+
+    def finish(self, user_id, embed=None):
+        stale = self._rendering.pop(user_id, False)
+        if embed is None or stale:
+            return
+        self._embeds[user_id] = (embed, self.clock() + self.ttl)
+        self._embeds.move_to_end(user_id)
+        while len(self._embeds) > self.max_size:
+            self._embeds.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._embeds.pop(user_id, None)
+        if user_id in self._rendering:
+            self._rendering[user_id] = True
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Per-user and per-guild token buckets kept in memory, so a burst is
+    turned away before it reaches the database.
+
+    A bucket is just ``[tokens, last_seen]``. Once a bucket has been idle
+    for ``per`` seconds it has refilled completely, which is exactly how a
+    missing bucket behaves, so the eviction sweep can drop it without
+    changing any decision.
+    """
+
+    def __init__(self, rate=5, per=10.0, guild_rate=60, guild_per=10.0, sweep_interval=60.0, clock=time.monotonic):
+        self.rate = rate
+        self.per = per
+        self.guild_rate = guild_rate
+        self.guild_per = guild_per
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.users = {}
+        self.guilds = {}
+        self.allowed = 0
+        self.rejected_user = 0
+        self.rejected_guild = 0
+        self.evicted = 0
+        self._task = None
+
+    @staticmethod
+    def _tokens(bucket, rate, per, now):
+        if bucket is None:
+            return rate
+        return min(rate, bucket[0] + (now - bucket[1]) * rate / per)
+
+    def hit(self, user_id, guild_id=None):
+        """Spends a token from the user's bucket and, inside a guild, the
+        guild's. Returns 0 when the call is allowed, otherwise the seconds
+        to wait before retrying. Nothing is spent when a call is refused."""
+        now = self.clock()
+        user_tokens = self._tokens(self.users.get(user_id), self.rate, self.per, now)
+        if user_tokens < 1:
+            self.rejected_user += 1
+            return (1 - user_tokens) * self.per / self.rate
+
+        if guild_id is not None:
+            guild_tokens = self._tokens(self.guilds.get(guild_id), self.guild_rate, self.guild_per, now)
+            if guild_tokens < 1:
+                self.rejected_guild += 1
+                return (1 - guild_tokens) * self.guild_per / self.guild_rate
+            self.guilds[guild_id] = [guild_tokens - 1, now]
+
+        self.users[user_id] = [user_tokens - 1, now]
+        self.allowed += 1
+        return 0
+
+    def evict(self, now=None):
+        now = now or self.clock()
+        evicted = 0
+        for buckets, per in ((self.users, self.per), (self.guilds, self.guild_per)):
+            idle = [key for key, (_, last_seen) in buckets.items() if now - last_seen >= per]
+            for key in idle:
+                del buckets[key]
+            evicted += len(idle)
+        self.evicted += evicted
+        return evicted
+
+    def stats(self):
+        return {
+            "users": len(self.users),
+            "guilds": len(self.guilds),
+            "allowed": self.allowed,
+            "rejected_user": self.rejected_user,
+            "rejected_guild": self.rejected_guild,
+            "evicted": self.evicted,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.evict()
@@ -0,0 +1,159 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from slot_engine import MACHINES
+
+
+class VectorMachine:
+    """NumPy form of a SlotMachine: one dense multiplier table per paying
+    prefix length, indexed by the base-(n+1) code of a line's first cells."""
+
+    def __init__(self, machine):
+        self.machine = machine
+        self.cum = np.cumsum(machine.probabilities)
+        self.cum[-1] = 1.0
+        self.lines = [np.array(cells) for cells in machine.line_cells]
+        self.tables = {}
+        base = machine.base
+        for codes, multiplier in machine.paytable:
+            length = len(codes)
+            table = self.tables.setdefault(length, np.zeros(base ** length, dtype=np.int64))
+            code = 0
+            for symbol in codes:
+                code = code * base + symbol + 1
+            table[code] = multiplier
+
+    def sample(self, rng, n):
+        draws = rng.random((n, self.machine.size))
+        return np.searchsorted(self.cum, draws, side="right").astype(np.int64)
+
+    def line_multipliers(self, grids):
+        base = self.machine.base
+        out = np.zeros((grids.shape[0], len(self.lines)), dtype=np.int64)
+        for index, cells in enumerate(self.lines):
+            symbols = grids[:, cells] + 1
+            code = np.zeros(grids.shape[0], dtype=np.int64)
+            best = out[:, index]
+            for length in range(1, len(cells) + 1):
+                code = code * base + symbols[:, length - 1]
+                table = self.tables.get(length)
+                if table is not None:
+                    hit = table[code]
+                    np.copyto(best, hit, where=hit > 0)
+        return out
+
+    def evaluate(self, grids):
+        """Returns (per-spin multiplier, per-line paid multiplier)."""
+        lines = self.line_multipliers(grids)
+        if self.machine.sum_lines:
+            return lines.sum(axis=1), lines
+        paid = np.zeros_like(lines)
+        first = np.argmax(lines > 0, axis=1)
+        rows = np.arange(lines.shape[0])
+        paid[rows, first] = lines[rows, first]
+        return paid.sum(axis=1), paid
+
+
+def simulate(machine_name, spins, batch, seed):
+    vector = VectorMachine(MACHINES[machine_name])
+    rng = np.random.default_rng(seed)
+    total = total_sq = hits = 0
+    per_line = np.zeros(len(vector.lines), dtype=np.int64)
+    done = 0
+    while done < spins:
+        n = min(batch, spins - done)
+        multipliers, paid = vector.evaluate(vector.sample(rng, n))
+        total += int(multipliers.sum())
+        total_sq += int((multipliers * multipliers).sum())
+        hits += int(np.count_nonzero(multipliers))
+        per_line += paid.sum(axis=0)
+        done += n
+    return spins, total, total_sq, hits, per_line
+
+
+def analyze(machine_name, spins, workers, batch, seed):
+    chunks = max(1, workers)
+    sizes = [spins // chunks + (1 if i < spins % chunks else 0) for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    started = time.perf_counter()
+    if chunks == 1:
+        results = [simulate(machine_name, sizes[0], batch, seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=chunks) as pool:
+            results = list(pool.map(simulate, [machine_name] * chunks, sizes, [batch] * chunks, seeds))
+    elapsed = time.perf_counter() - started
+
+    n = sum(r[0] for r in results)
+    total = sum(r[1] for r in results)
+    total_sq = sum(r[2] for r in results)
+    hits = sum(r[3] for r in results)
+    per_line = sum(r[4] for r in results)
+
+    rtp = total / n
+    variance = total_sq / n - rtp * rtp
+    hit_rate = hits / n
+    return {
+        "spins": n,
+        "seconds": elapsed,
+        "rtp": rtp,
+        "rtp_ci": 1.96 * math.sqrt(variance / n),
+        "hit_rate": hit_rate,
+        "hit_rate_ci": 1.96 * math.sqrt(hit_rate * (1 - hit_rate) / n),
+        "variance": variance,
+        "per_line": [line / n for line in per_line],
+    }
+
+
+def benchmark(machine_name, spins, seed):
+    machine = MACHINES[machine_name]
+    vector = VectorMachine(machine)
+    grids = vector.sample(np.random.default_rng(seed), spins)
+    rows = grids.tolist()
+
+    started = time.perf_counter()
+    scalar = [machine.evaluate(grid)[0] for grid in rows]
+    scalar_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized, _ = vector.evaluate(grids)
+    vector_time = time.perf_counter() - started
+
+    mismatches = int(np.count_nonzero(np.asarray(scalar) != vectorized))
+    print(f"engine:     {spins / scalar_time:>14,.0f} spins/s")
+    print(f"vectorized: {spins / vector_time:>14,.0f} spins/s")
+    print(f"mismatches: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo return-to-player analysis of the slot machines")
+    parser.add_argument("--machine", choices=sorted(MACHINES), default="classic")
+    parser.add_argument("--spins", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=250_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="compare the scalar engine with the vectorized evaluator")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.machine, min(args.spins, 500_000), args.seed)
+        return
+
+    report = analyze(args.machine, args.spins, args.workers, args.batch, args.seed)
+    machine = MACHINES[args.machine]
+    print(f"{machine!r}: {report['spins']:,} spins in {report['seconds']:.2f}s ({report['spins'] / report['seconds']:,.0f} spins/s)")
+    print(f"RTP:           {report['rtp']:.4%} ± {report['rtp_ci']:.4%}")
+    print(f"Hit frequency: {report['hit_rate']:.4%} ± {report['hit_rate_ci']:.4%}")
+    print(f"Variance:      {report['variance']:.2f} (std dev {math.sqrt(report['variance']):.2f} bets)")
+    print("Per-line contribution to RTP:")
+    for line, contribution in zip(machine.paylines, report["per_line"]):
+        cells = " ".join(f"{row}{reel}" for row, reel in line)
+        print(f"  [{cells}] {contribution:.4%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import random
+
+slot_symbols = ["🍒", "🍉", "🔔", "⭐", "💎", "🤡"]
+symbol_weights = {
+    "🍒": 0.27,
+    "🍉": 0.2,
+    "🔔": 0.1,
+    "⭐": 0.08,
+    "💎": 0.05,
+    "🤡": 0.3
+}
+payouts = {
+    "🍒🍒🍒": 5,
+    "🍉🍉🍉": 10,
+    "🔔🔔🔔": 20,
+    "⭐⭐⭐": 50,
+    "💎💎💎": 100
+}
+
+
+def split_symbols(key, symbols):
+    """Splits a paytable key such as "🍒🍒🍒" into symbols. Keys may also be
+    given as sequences already."""
+    if not isinstance(key, str):
+        return list(key)
+    out = []
+    rest = key
+    ordered = sorted(symbols, key=len, reverse=True)
+    while rest:
+        for symbol in ordered:
+            if rest.startswith(symbol):
+                out.append(symbol)
+                rest = rest[len(symbol):]
+                break
+        else:
+            raise ValueError(f"Unknown symbol in paytable key {key!r}")
+    return out
+
+
+class SlotMachine:
+    """A slot machine compiled once into integer-coded lookup structures.
+
+    The grid is a flat row-major list of symbol indexes. A payline is a
+    sequence of (row, reel) cells. A paytable entry pays when a line
+    starts with its symbols, so "🍒🍒🍒" on a five-reel line is a
+    left-aligned three of a kind. Lines are walked with a base-(n+1) prefix
+    code and one dict lookup per cell. No strings are built while a spin is
+    evaluated.
+
+    With ``sum_lines`` off, the first paying line wins, as the original 3x3
+    game does. With it on, the longest match on every line is summed.
+    """
+
+    def __init__(self, name, symbols, weights, paytable, paylines, rows=3, reels=3, sum_lines=False):
+        self.name = name
+        self.symbols = list(symbols)
+        self.rows = rows
+        self.reels = reels
+        self.size = rows * reels
+        self.sum_lines = sum_lines
+        self.indices = list(range(len(self.symbols)))
+
+        total = 0.0
+        self.cum_weights = []
+        for symbol in self.symbols:
+            total += weights[symbol]
+            self.cum_weights.append(total)
+        self.probabilities = [weights[symbol] / total for symbol in self.symbols]
+
+        self.paylines = [tuple(line) for line in paylines]
+        self.line_cells = [tuple(row * reels + reel for row, reel in line) for line in self.paylines]
+
+        base = len(self.symbols) + 1
+        self.base = base
+        self.pays = {}
+        self.prefixes = set()
+        self.paytable = []
+        for key, multiplier in paytable.items():
+            codes = [self.symbols.index(symbol) for symbol in split_symbols(key, self.symbols)]
+            code = 0
+            for symbol in codes:
+                code = code * base + symbol + 1
+                self.prefixes.add(code)
+            self.pays[code] = multiplier
+            self.paytable.append((tuple(codes), multiplier))
+
+    def __repr__(self):
+        return f"SlotMachine({self.name!r}, {self.rows}x{self.reels}, {len(self.paylines)} lines)"
+
+    def spin(self, rng=random):
+        return rng.choices(self.indices, cum_weights=self.cum_weights, k=self.size)
+
+    def random_symbol(self, rng=random):
+        return self.symbols[rng.choices(self.indices, cum_weights=self.cum_weights)[0]]
+
+    def line_multiplier(self, grid, cells):
+        base = self.base
+        pays = self.pays
+        prefixes = self.prefixes
+        code = 0
+        best = 0
+        for cell in cells:
+            code = code * base + grid[cell] + 1
+            if code not in prefixes:
+                break
+            best = pays.get(code, best)
+        return best
+
+    def evaluate(self, grid):
+        """Returns (multiplier, winning line indexes)."""
+        total = 0
+        winners = []
+        for index, cells in enumerate(self.line_cells):
+            multiplier = self.line_multiplier(grid, cells)
+            if multiplier:
+                if not self.sum_lines:
+                    return multiplier, [index]
+                total += multiplier
+                winners.append(index)
+        return total, winners
+
+    def payout(self, grid, bet):
+        return self.evaluate(grid)[0] * bet
+
+    def render(self, grid):
+        symbols = self.symbols
+        reels = self.reels
+        return [[symbols[grid[row * reels + reel]] for reel in range(reels)] for row in range(self.rows)]
+
+
+def across(*rows):
+    """A payline that takes the given row on each successive reel."""
+    return [(row, reel) for reel, row in enumerate(rows)]
+
+
+CLASSIC_PAYLINES = (
+    [across(row, row, row) for row in range(3)]
+    + [[(row, reel) for row in range(3)] for reel in range(3)]
+    + [across(0, 1, 2), across(2, 1, 0)]
+)
+
+DELUXE_PAYLINES = [
+    across(1, 1, 1, 1, 1),
+    across(0, 0, 0, 0, 0),
+    across(2, 2, 2, 2, 2),
+    across(0, 1, 2, 1, 0),
+    across(2, 1, 0, 1, 2),
+    across(1, 0, 0, 0, 1),
+    across(1, 2, 2, 2, 1),
+]
+
+deluxe_payouts = {
+    "🍒🍒🍒": 2, "🍒🍒🍒🍒": 5, "🍒🍒🍒🍒🍒": 12,
+    "🍉🍉🍉": 3, "🍉🍉🍉🍉": 10, "🍉🍉🍉🍉🍉": 25,
+    "🔔🔔🔔": 8, "🔔🔔🔔🔔": 25, "🔔🔔🔔🔔🔔": 100,
+    "⭐⭐⭐": 12, "⭐⭐⭐⭐": 60, "⭐⭐⭐⭐⭐": 250,
+    "💎💎💎": 25, "💎💎💎💎": 125, "💎💎💎💎💎": 1250,
+}
+
+MACHINES = {
+    "classic": SlotMachine("classic", slot_symbols, symbol_weights, payouts, CLASSIC_PAYLINES),
+    "deluxe": SlotMachine("deluxe", slot_symbols, symbol_weights, deluxe_payouts, DELUXE_PAYLINES, rows=3, reels=5, sum_lines=True),
+}
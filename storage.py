@@ -0,0 +1,981 @@
+import asyncio
+import logging
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from archive import export_history, finish_batch, take_batch, write_batch
+from migrations import migrate
+
+STARTING_BALANCE = 100
+
+log = logging.getLogger(__name__)
+
+# Connection settings by name. "legacy" is what SQLite does out of the box
+# and is kept for comparison; "wal" only fsyncs at checkpoints and lets
+# readers run during a write; "durable" is WAL that still fsyncs every commit.
+STORAGE_PROFILES = {
+    "legacy": {"journal_mode": "DELETE", "synchronous": "FULL", "cache_size": -2_000, "mmap_size": 0, "cached_statements": 128},
+    "wal": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -64_000, "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY", "cached_statements": 512},
+    "durable": {"journal_mode": "WAL", "synchronous": "FULL", "cache_size": -64_000, "mmap_size": 256 * 1024 * 1024,
+                "temp_store": "MEMORY", "cached_statements": 512},
+}
+
+
+def connect(path, profile="wal"):
+    settings = dict(STORAGE_PROFILES[profile])
+    conn = sqlite3.connect(path, cached_statements=settings.pop("cached_statements"))
+    for pragma, value in settings.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def get_balance(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,))
+    result = cursor.fetchone()
+    if result is None:
+        cursor.execute("INSERT INTO currency (user_id, balance) VALUES (?, ?)", (user_id, STARTING_BALANCE))
+        conn.commit()
+        return STARTING_BALANCE
+    return result[0]
+
+
+STATS_UPSERT = """
+    INSERT INTO stats (user_id, games_played, wins, losses, total_earned, largest_win)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        games_played = games_played + excluded.games_played,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        total_earned = total_earned + excluded.total_earned,
+        largest_win = MAX(largest_win, excluded.largest_win)
+"""
+
+SYMBOL_COUNTS_UPSERT = """
+    INSERT INTO symbol_counts (user_id, symbol, count) VALUES (?, ?, ?)
+    ON CONFLICT(user_id, symbol) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def count_symbols(final_grid):
+    counts = {}
+    if final_grid is not None:
+        for row in final_grid:
+            for symbol in row:
+                counts[symbol] = counts.get(symbol, 0) + 1
+    return counts
+
+
+def write_stats(cursor, user_id, winnings, bet, final_grid=None):
+    profit = max(0, winnings - bet)
+    win = winnings > bet
+    cursor.execute(STATS_UPSERT, (user_id, 1, 1 if win else 0, 0 if win else 1, profit, profit))
+    cursor.executemany(SYMBOL_COUNTS_UPSERT, [(user_id, symbol, count) for symbol, count in count_symbols(final_grid).items()])
+
+
+def write_blackjack_stats(cursor, user_id, payout, bet):
+    profit = payout - bet
+    cursor.execute("""
+        INSERT INTO blackjack_stats (user_id, blackjack_wins, blackjack_losses, blackjack_total_earned, blackjack_largest_win)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            blackjack_wins = blackjack_wins + excluded.blackjack_wins,
+            blackjack_losses = blackjack_losses + excluded.blackjack_losses,
+            blackjack_total_earned = blackjack_total_earned + excluded.blackjack_total_earned,
+            blackjack_largest_win = MAX(blackjack_largest_win, excluded.blackjack_largest_win)
+    """, (user_id, 1 if profit > 0 else 0, 1 if profit < 0 else 0, max(0, profit), max(0, profit)))
+
+
+def write_ledger(cursor, user_id, game, kind, amount):
+    cursor.execute("""
+        INSERT INTO ledger (user_id, game, kind, amount, balance_after, created_at)
+        SELECT user_id, ?, ?, ?, balance, ? FROM currency WHERE user_id = ?
+    """, (game, kind, amount, int(time.time()), user_id))
+
+
+CHALLENGE_UPSERT = """
+    INSERT INTO challenge_progress (user_id, period, bucket, wins) VALUES (?, ?, ?, ?)
+    ON CONFLICT(user_id, period, bucket) DO UPDATE SET wins = wins + excluded.wins
+"""
+
+
+def challenge_buckets(today=None):
+    """Day bucket is the date's ordinal, week bucket is ISO year * 100 + ISO week.
+    A new bucket starting is what resets a challenge, so nothing is swept."""
+    today = today or date.today()
+    year, week, _ = today.isocalendar()
+    return today.toordinal(), year * 100 + week
+
+
+def write_challenge_win(cursor, user_id, wins=1, today=None):
+    day, week = challenge_buckets(today)
+    cursor.executemany(CHALLENGE_UPSERT, [(user_id, "day", day, wins), (user_id, "week", week, wins)])
+
+
+def get_challenges(conn, user_id, today=None):
+    day, week = challenge_buckets(today)
+    wins = {"day": 0, "week": 0}
+    for period, count in conn.execute("""
+        SELECT period, wins FROM challenge_progress
+        WHERE user_id = ? AND ((period = 'day' AND bucket = ?) OR (period = 'week' AND bucket = ?))
+    """, (user_id, day, week)):
+        wins[period] = count
+    return wins["day"], wins["week"]
+
+
+def prune_challenges(conn, keep_days=7, keep_weeks=4, batch=500, today=None):
+    """Deletes expired buckets in batches of ``batch`` rows, committing
+    between batches. Returns the number of rows removed."""
+    today = today or date.today()
+    day_cutoff = today.toordinal() - keep_days
+    week_cutoff = challenge_buckets(today - timedelta(weeks=keep_weeks))[1]
+    removed = 0
+    for period, cutoff in (("day", day_cutoff), ("week", week_cutoff)):
+        while True:
+            with conn:
+                cursor = conn.execute("""
+                    DELETE FROM challenge_progress WHERE (user_id, period, bucket) IN (
+                        SELECT user_id, period, bucket FROM challenge_progress
+                        WHERE period = ? AND bucket < ? LIMIT ?
+                    )
+                """, (period, cutoff, batch))
+            removed += cursor.rowcount
+            if cursor.rowcount < batch:
+                break
+    return removed
+
+
+def place_wager(conn, user_id, game, bet):
+    """Debits ``bet`` if the user can cover it. Returns the new balance, or
+    None when the balance is too low."""
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT OR IGNORE INTO currency (user_id, balance) VALUES (?, ?)", (user_id, STARTING_BALANCE))
+        cursor.execute("UPDATE currency SET balance = balance - ? WHERE user_id = ? AND balance >= ?", (bet, user_id, bet))
+        if cursor.rowcount == 0:
+            return None
+        write_ledger(cursor, user_id, game, "wager", -bet)
+        return cursor.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+def settle_wager(conn, user_id, game, bet, payout, final_grid=None):
+    """Credits ``payout`` (stake included) for a wager placed with
+    place_wager and records stats, challenge progress and the ledger row in
+    the same transaction. Returns the new balance."""
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE currency SET balance = balance + ? WHERE user_id = ?", (payout, user_id))
+        write_ledger(cursor, user_id, game, "payout", payout)
+        write_stats(cursor, user_id, payout, bet, final_grid)
+        if game == "blackjack":
+            write_blackjack_stats(cursor, user_id, payout, bet)
+        if payout > bet:
+            write_challenge_win(cursor, user_id)
+        return cursor.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+def top_balances(conn, limit):
+    cursor = conn.execute("SELECT user_id, balance FROM currency ORDER BY balance DESC, user_id ASC LIMIT ?", (limit,))
+    return cursor.fetchall()
+
+
+def leaderboard_page(conn, limit, after=None, before=None):
+    """Keyset pagination over idx_currency_balance. ``after``/``before`` are
+    the (balance, user_id) of the last/first row of the neighbouring page."""
+    if after is not None:
+        balance, user_id = after
+        return conn.execute("""
+            SELECT user_id, balance FROM currency
+            WHERE balance <= ? AND (balance < ? OR user_id > ?)
+            ORDER BY balance DESC, user_id ASC LIMIT ?
+        """, (balance, balance, user_id, limit)).fetchall()
+    if before is not None:
+        balance, user_id = before
+        rows = conn.execute("""
+            SELECT user_id, balance FROM currency
+            WHERE balance >= ? AND (balance > ? OR user_id < ?)
+            ORDER BY balance ASC, user_id DESC LIMIT ?
+        """, (balance, balance, user_id, limit)).fetchall()
+        rows.reverse()
+        return rows
+    return conn.execute("SELECT user_id, balance FROM currency ORDER BY balance DESC, user_id ASC LIMIT ?", (limit,)).fetchall()
+
+
+def get_rank(conn, user_id):
+    row = conn.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,)).fetchone()
+    if row is None:
+        return None, None
+    balance = row[0]
+    ahead = conn.execute(
+        "SELECT COUNT(*) FROM currency WHERE balance >= ? AND (balance > ? OR user_id < ?)",
+        (balance, balance, user_id),
+    ).fetchone()[0]
+    return ahead + 1, balance
+
+
+PROFILE_COLUMNS = (
+    "games_played", "wins", "losses", "total_earned", "largest_win",
+    "blackjack_wins", "blackjack_losses", "blackjack_total_earned", "blackjack_largest_win",
+    "balance", "favourite_symbol",
+)
+
+
+def get_profiles(conn, user_ids, batch=500):
+    """Loads the profiles of everyone in ``user_ids`` who has played, as a
+    dict of user id to a tuple in PROFILE_COLUMNS order. One query per
+    ``batch`` users."""
+    user_ids = list(user_ids)
+    profiles = {}
+    for start in range(0, len(user_ids), batch):
+        chunk = user_ids[start:start + batch]
+        rows = conn.execute(f"""
+            SELECT s.user_id, s.games_played, s.wins, s.losses, s.total_earned, s.largest_win,
+                   COALESCE(b.blackjack_wins, 0), COALESCE(b.blackjack_losses, 0),
+                   COALESCE(b.blackjack_total_earned, 0), COALESCE(b.blackjack_largest_win, 0),
+                   COALESCE(c.balance, ?),
+                   (SELECT symbol FROM symbol_counts WHERE user_id = s.user_id ORDER BY count DESC LIMIT 1)
+            FROM stats s
+            LEFT JOIN blackjack_stats b ON b.user_id = s.user_id
+            LEFT JOIN currency c ON c.user_id = s.user_id
+            WHERE s.user_id IN ({", ".join("?" * len(chunk))})
+        """, (STARTING_BALANCE, *chunk)).fetchall()
+        for user_id, *profile in rows:
+            profiles[user_id] = tuple(profile)
+    return profiles
+
+
+def add_balance(conn, user_id, amount):
+    with conn:
+        conn.execute("""
+            INSERT INTO currency (user_id, balance) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance
+        """, (user_id, amount))
+        write_ledger(conn.cursor(), user_id, "admin", "grant", amount)
+        return conn.execute("SELECT balance FROM currency WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+BATCH_LEDGER_INSERT = """
+    INSERT INTO ledger (user_id, game, kind, amount, balance_after, created_at, batch_id)
+    SELECT user_id, 'admin', ?, amount, balance + amount, ?, ? FROM ({changes}) WHERE amount != 0
+"""
+
+
+def apply_batch(cursor, batch_id):
+    """Moves balances by the ledger rows already written for ``batch_id`` and
+    returns them as (user_id, amount) pairs."""
+    cursor.execute("""
+        UPDATE currency SET balance = balance + (
+            SELECT amount FROM ledger WHERE batch_id = ? AND ledger.user_id = currency.user_id
+        ) WHERE user_id IN (SELECT user_id FROM ledger WHERE batch_id = ?)
+    """, (batch_id, batch_id))
+    return cursor.execute("SELECT user_id, amount FROM ledger WHERE batch_id = ?", (batch_id,)).fetchall()
+
+
+def bulk_adjust(conn, batch_id, action, amount, user_ids=None, target="", actor_id=None, dry_run=False, batch=500):
+    """Grants ``amount`` to, or deducts it from, every user in ``user_ids``
+    (everyone with a balance when None) in one transaction. Deductions stop
+    at zero. Every change gets a ledger row tagged with ``batch_id`` so the
+    batch can be undone. With ``dry_run`` the transaction is rolled back
+    after counting. Returns (status, changes) where status is "applied" or
+    "dry_run" and changes are (user_id, amount) pairs."""
+    amount_sql = "?" if action == "grant" else "-MIN(balance, ?)"
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        if user_ids is None:
+            chunks = [("1", [])]
+        else:
+            user_ids = sorted(set(user_ids))
+            cursor.executemany("INSERT OR IGNORE INTO currency (user_id, balance) VALUES (?, ?)",
+                               [(user_id, STARTING_BALANCE) for user_id in user_ids])
+            chunks = [(f"user_id IN ({','.join('?' * len(chunk))})", chunk)
+                      for chunk in (user_ids[i:i + batch] for i in range(0, len(user_ids), batch))]
+        now = int(time.time())
+        for where, params in chunks:
+            changes = f"SELECT user_id, balance, {amount_sql} AS amount FROM currency WHERE {where}"
+            cursor.execute(BATCH_LEDGER_INSERT.format(changes=changes), (action, now, batch_id, amount, *params))
+        changes = apply_batch(cursor, batch_id)
+        cursor.execute("""
+            INSERT INTO admin_batches (batch_id, action, amount, target, actor_id, users, total, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (batch_id, action, amount, target, actor_id, len(changes), sum(change for _, change in changes), now))
+    except Exception:
+        conn.rollback()
+        raise
+    if dry_run:
+        conn.rollback()
+        return "dry_run", changes
+    conn.commit()
+    return "applied", changes
+
+
+def undo_batch(conn, batch_id, undo_id, actor_id=None):
+    """Reverses a bulk_adjust batch in one transaction, recorded as batch
+    ``undo_id``. A grant is only taken back down to zero, so coins already
+    spent stay spent. Returns (status, changes) where status is "undone",
+    "missing", "already_undone" or "archived" once its ledger rows have
+    been moved out by the archiver."""
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        row = cursor.execute("SELECT undone_by, users FROM admin_batches WHERE batch_id = ? AND action != 'undo'", (batch_id,)).fetchone()
+        if row is None or row[0] is not None:
+            conn.rollback()
+            return ("missing" if row is None else "already_undone"), []
+        if row[1] and cursor.execute("SELECT 1 FROM ledger WHERE batch_id = ? LIMIT 1", (batch_id,)).fetchone() is None:
+            conn.rollback()
+            return "archived", []
+        now = int(time.time())
+        changes = """
+            SELECT c.user_id, c.balance, CASE WHEN l.amount > 0 THEN -MIN(c.balance, l.amount) ELSE -l.amount END AS amount
+            FROM ledger l JOIN currency c ON c.user_id = l.user_id WHERE l.batch_id = ?
+        """
+        cursor.execute(BATCH_LEDGER_INSERT.format(changes=changes), ("undo", now, undo_id, batch_id))
+        changes = apply_batch(cursor, undo_id)
+        cursor.execute("""
+            INSERT INTO admin_batches (batch_id, action, amount, target, actor_id, users, total, created_at)
+            VALUES (?, 'undo', 0, ?, ?, ?, ?, ?)
+        """, (undo_id, batch_id, actor_id, len(changes), sum(change for _, change in changes), now))
+        cursor.execute("UPDATE admin_batches SET undone_by = ? WHERE batch_id = ?", (undo_id, batch_id))
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return "undone", changes
+
+
+def claim_daily_reward(conn, user_id, reward, today):
+    """Returns (status, balance) where status is "claimed", "already_claimed" or "new"."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT balance, last_claim_date FROM currency WHERE user_id = ?", (user_id,))
+    result = cursor.fetchone()
+    today_str = today.strftime("%Y-%m-%d")
+
+    if result is None:
+        cursor.execute("INSERT INTO currency (user_id, balance, last_claim_date) VALUES (?, ?, ?)", (user_id, STARTING_BALANCE, today_str))
+        conn.commit()
+        return "new", STARTING_BALANCE
+
+    balance, last_claim_str = result
+    if last_claim_str and datetime.strptime(last_claim_str, "%Y-%m-%d").date() == today:
+        return "already_claimed", balance
+
+    cursor.execute("UPDATE currency SET balance = balance + ?, last_claim_date = ? WHERE user_id = ?", (reward, today_str, user_id))
+    if reward:
+        write_ledger(cursor, user_id, "daily", "reward", reward)
+    conn.commit()
+    return "claimed", balance + reward
+
+
+def save_game(conn, row, expires_at):
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO games (game_id, kind, user_id, state, channel_id, message_id, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (*row, expires_at))
+
+
+def delete_game(conn, game_id):
+    with conn:
+        conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+
+def load_games(conn):
+    return conn.execute("SELECT game_id, kind, user_id, state, channel_id, message_id, expires_at FROM games").fetchall()
+
+
+def maintain(conn, analyze=False, vacuum_ratio=None):
+    """Truncates the WAL, and optionally refreshes planner statistics and
+    rebuilds the file once more than ``vacuum_ratio`` of its pages are free.
+    Returns the steps that ran."""
+    done = []
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        done.append("checkpoint")
+    if analyze:
+        conn.execute("PRAGMA optimize")
+        done.append("optimize")
+    if vacuum_ratio is not None:
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if pages and free / pages > vacuum_ratio:
+            conn.execute("VACUUM")
+            done.append("vacuum")
+    return done
+
+
+def get_setting(conn, key):
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_setting(conn, key, value):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+
+def flush_batch(conn, balances, stats, symbols, blackjack, challenges, ledger, games=(), finished_games=()):
+    with conn:
+        conn.executemany("""
+            INSERT INTO currency (user_id, balance) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET balance = excluded.balance
+        """, balances)
+        conn.executemany(STATS_UPSERT, stats)
+        conn.executemany(SYMBOL_COUNTS_UPSERT, symbols)
+        conn.executemany("""
+            INSERT INTO blackjack_stats (user_id, blackjack_wins, blackjack_losses, blackjack_total_earned, blackjack_largest_win)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                blackjack_wins = blackjack_wins + excluded.blackjack_wins,
+                blackjack_losses = blackjack_losses + excluded.blackjack_losses,
+                blackjack_total_earned = blackjack_total_earned + excluded.blackjack_total_earned,
+                blackjack_largest_win = MAX(blackjack_largest_win, excluded.blackjack_largest_win)
+        """, blackjack)
+        conn.executemany(CHALLENGE_UPSERT, challenges)
+        conn.executemany("""
+            INSERT INTO ledger (user_id, game, kind, amount, balance_after, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, ledger)
+        conn.executemany("""
+            INSERT OR REPLACE INTO games (game_id, kind, user_id, state, channel_id, message_id, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, games)
+        conn.executemany("DELETE FROM games WHERE game_id = ?", finished_games)
+
+
+class Database:
+    """Owns one long-lived SQLite connection that is only ever touched from a
+    single worker thread, so queries never run on the event loop.
+
+    With ``write_behind`` enabled (the default) balances are served from an
+    in-memory cache and every mutation is applied to it synchronously on the
+    loop, which keeps check-and-debit atomic without a database round-trip.
+    Dirty balances, stat deltas and ledger rows are written back in one
+    ``executemany`` transaction every ``flush_interval`` seconds, or sooner
+    once ``flush_threshold`` users are dirty. Saved game state rides along
+    in the same transaction.
+
+    The connection uses the named entry of STORAGE_PROFILES. Once
+    ``quiet_period`` seconds have passed since the last ``note_activity``
+    call a maintenance pass truncates the WAL, and at most every
+    ``analyze_interval``/``vacuum_interval`` seconds also runs PRAGMA
+    optimize or a VACUUM of a fragmented file. Only user traffic should be
+    noted; the bot's own periodic queries would otherwise keep it from ever
+    looking quiet.
+
+    ``on_query``, if given, is called with each helper's name and how long
+    the caller waited for it, including time queued behind other queries.
+    ``on_change`` is called with a user id whenever that user's balance or
+    stats change.
+
+    With an ``archive_dir``, ledger rows older than ``archive_after`` seconds
+    are moved there once a day, ``archive_batch`` rows per transaction, and
+    the next quiet maintenance pass checks whether the file needs a VACUUM.
+    """
+
+    def __init__(self, path, write_behind=True, flush_interval=0.5, flush_threshold=256, max_cached=50_000,
+                 on_query=None, on_change=None, profile="wal", quiet_period=30.0, analyze_interval=6 * 3600,
+                 vacuum_interval=7 * 86400, vacuum_ratio=0.2, archive_dir=None, archive_after=90 * 86400,
+                 archive_batch=1000):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.archive_after = archive_after
+        self.archive_batch = archive_batch
+        self.archive_interval = 86400
+        self.archive_pause = 0.05
+        self.rows_archived = 0
+        self._archive_task = None
+        self._archive_lock = None
+        self.profile = profile
+        self.quiet_period = quiet_period
+        self.analyze_interval = analyze_interval
+        self.vacuum_interval = vacuum_interval
+        self.vacuum_ratio = vacuum_ratio
+        self.maintenance_interval = 60
+        self.maintenance_runs = 0
+        self._last_activity = time.monotonic()
+        self._last_analyze = self._last_vacuum = time.monotonic()
+        self._maintenance_task = None
+        self.on_query = on_query
+        self.on_change = on_change
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_cached = max_cached
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = None
+
+        self._balances = OrderedDict()
+        self._dirty = set()
+        self._stats = {}
+        self._symbols = {}
+        self._blackjack = {}
+        self._challenges = {}
+        self._ledger = []
+        self._games = {}
+        self._flush_lock = None
+        self._flush_wanted = None
+        self._flush_task = None
+        # Cleared while a bulk batch runs so no cached balance moves under it.
+        self._batch_idle = asyncio.Event()
+        self._batch_idle.set()
+        self._batch_lock = None
+        self._batches = 0
+        self._prune_task = None
+        self.prune_interval = 3600
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def _call(self, func, args):
+        if self._conn is None:
+            self._conn = connect(self.path, self.profile)
+        return func(self._conn, *args)
+
+    def run_sync(self, func, *args):
+        return self._executor.submit(self._call, func, args).result()
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        if self.on_query is None:
+            return await loop.run_in_executor(self._executor, self._call, func, args)
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, self._call, func, args)
+        finally:
+            self.on_query(func.__name__, time.perf_counter() - started)
+
+    def note_activity(self):
+        self._last_activity = time.monotonic()
+
+    def migrate(self):
+        return self.run_sync(migrate)
+
+    def start(self):
+        if self.write_behind and self._flush_task is None:
+            self._flush_lock = asyncio.Lock()
+            self._flush_wanted = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self._prune_task is None:
+            self._prune_task = asyncio.create_task(self._prune_loop())
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        if self.archive_dir and self._archive_task is None:
+            self._archive_task = asyncio.create_task(self._archive_loop())
+
+    async def maintain(self, analyze=False, vacuum=False):
+        return await self.run(maintain, analyze, self.vacuum_ratio if vacuum else None)
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            now = time.monotonic()
+            if now - self._last_activity < self.quiet_period:
+                continue
+            analyze = now - self._last_analyze >= self.analyze_interval
+            vacuum = now - self._last_vacuum >= self.vacuum_interval
+            try:
+                await self.flush()
+                done = await self.maintain(analyze, vacuum)
+            except Exception:
+                log.exception("Database maintenance failed")
+                continue
+            self.maintenance_runs += 1
+            if analyze:
+                self._last_analyze = now
+            if vacuum:
+                self._last_vacuum = now
+            log.debug("Database maintenance: %s", ", ".join(done) or "nothing to do")
+
+    async def _prune_loop(self):
+        while True:
+            try:
+                removed = await self.prune_challenges()
+                if removed:
+                    log.info("Pruned %d expired challenge buckets", removed)
+            except Exception:
+                log.exception("Challenge pruning failed")
+            await asyncio.sleep(self.prune_interval)
+
+    async def archive_ledger(self):
+        """Archives every ledger row older than ``archive_after``, a small
+        batch at a time. Only selecting and deleting a batch use the worker;
+        encoding and compressing it runs on another thread."""
+        if self._archive_lock is None:
+            self._archive_lock = asyncio.Lock()
+        cutoff = int(time.time()) - self.archive_after
+        archived = 0
+        async with self._archive_lock:
+            while True:
+                rows = await self.run(take_batch, self.archive_dir, cutoff, self.archive_batch)
+                if not rows:
+                    break
+                await asyncio.to_thread(write_batch, self.archive_dir, rows)
+                await self.run(finish_batch, rows)
+                archived += len(rows)
+                self.rows_archived += len(rows)
+                if len(rows) < self.archive_batch:
+                    break
+                await asyncio.sleep(self.archive_pause)
+        if archived:
+            # Let the next quiet pass see whether the freed pages are worth a VACUUM.
+            self._last_vacuum = float("-inf")
+        return archived
+
+    async def _archive_loop(self):
+        while True:
+            try:
+                archived = await self.archive_ledger()
+                if archived:
+                    log.info("Archived %d ledger rows to %s", archived, self.archive_dir)
+            except Exception:
+                log.exception("Ledger archiving failed")
+            await asyncio.sleep(self.archive_interval)
+
+    async def export_history(self, user_ids, out):
+        """Streams the gzip JSONL history of ``user_ids`` into ``out`` from a
+        separate read-only connection, so a long export doesn't hold up the
+        worker. Returns the number of rows."""
+        await self.flush()
+        return await asyncio.to_thread(export_history, self.path, self.archive_dir or "", user_ids, out)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            await self.flush()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            self._prune_task = None
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        if self._archive_task is not None:
+            self._archive_task.cancel()
+            self._archive_task = None
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close)
+        self._executor.shutdown(wait=True)
+
+    async def flush(self):
+        if not self.write_behind:
+            return
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not (self._dirty or self._stats or self._symbols or self._blackjack or self._challenges or self._ledger or self._games):
+                return
+            dirty, self._dirty = self._dirty, set()
+            stats, self._stats = self._stats, {}
+            symbols, self._symbols = self._symbols, {}
+            blackjack, self._blackjack = self._blackjack, {}
+            challenges, self._challenges = self._challenges, {}
+            ledger, self._ledger = self._ledger, []
+            games, self._games = self._games, {}
+
+            balances = [(user_id, self._balances[user_id]) for user_id in dirty]
+            try:
+                await self.run(
+                    flush_batch,
+                    balances,
+                    [(user_id, *delta) for user_id, delta in stats.items()],
+                    [(user_id, symbol, count) for (user_id, symbol), count in symbols.items()],
+                    [(user_id, *delta) for user_id, delta in blackjack.items()],
+                    [(*key, wins) for key, wins in challenges.items()],
+                    ledger,
+                    [(*row, expires_at) for row, expires_at in (entry for entry in games.values() if entry is not None)],
+                    [(game_id,) for game_id, entry in games.items() if entry is None],
+                )
+            except Exception:
+                log.exception("Write-behind flush failed, keeping %d dirty balances", len(dirty))
+                self._dirty |= dirty
+                for user_id, delta in stats.items():
+                    self._merge_stats(user_id, *delta)
+                for key, count in symbols.items():
+                    self._symbols[key] = self._symbols.get(key, 0) + count
+                for user_id, delta in blackjack.items():
+                    self._merge_blackjack(user_id, *delta)
+                for key, wins in challenges.items():
+                    self._challenges[key] = self._challenges.get(key, 0) + wins
+                self._ledger[:0] = ledger
+                self._games = {**games, **self._games}
+                return
+            self.flushes += 1
+            self.rows_flushed += len(balances) + len(stats) + len(symbols) + len(blackjack) + len(challenges) + len(ledger) + len(games)
+            self._trim()
+
+    def _request_flush(self):
+        if self._flush_wanted is not None and len(self._dirty) >= self.flush_threshold:
+            self._flush_wanted.set()
+
+    def _trim(self):
+        excess = len(self._balances) - self.max_cached
+        if excess <= 0:
+            return
+        for user_id in list(self._balances):
+            if excess <= 0:
+                break
+            if user_id not in self._dirty:
+                del self._balances[user_id]
+                excess -= 1
+
+    async def _load(self, user_id):
+        await self._batch_idle.wait()
+        while user_id not in self._balances:
+            batches = self._batches
+            balance = await self.run(get_balance, user_id)
+            # A balance read from before a bulk batch started is stale.
+            if batches == self._batches and self._batch_idle.is_set():
+                self._balances.setdefault(user_id, balance)
+                self._trim()
+            else:
+                await self._batch_idle.wait()
+        self._balances.move_to_end(user_id)
+        return self._balances[user_id]
+
+    def _changed(self, user_id):
+        if self.on_change is not None:
+            self.on_change(int(user_id))
+
+    def _adjust(self, user_id, amount, game, kind):
+        self._changed(user_id)
+        balance = self._balances[user_id] + amount
+        self._balances[user_id] = balance
+        self._dirty.add(user_id)
+        self._ledger.append((user_id, game, kind, amount, balance, int(time.time())))
+        self._request_flush()
+        return balance
+
+    def _merge_stats(self, user_id, games, wins, losses, earned, largest):
+        delta = self._stats.get(user_id)
+        if delta is None:
+            self._stats[user_id] = [games, wins, losses, earned, largest]
+        else:
+            delta[0] += games
+            delta[1] += wins
+            delta[2] += losses
+            delta[3] += earned
+            delta[4] = max(delta[4], largest)
+
+    def _merge_symbols(self, user_id, final_grid):
+        for symbol, count in count_symbols(final_grid).items():
+            key = (user_id, symbol)
+            self._symbols[key] = self._symbols.get(key, 0) + count
+
+    def _merge_blackjack(self, user_id, wins, losses, earned, largest):
+        delta = self._blackjack.get(user_id)
+        if delta is None:
+            self._blackjack[user_id] = [wins, losses, earned, largest]
+        else:
+            delta[0] += wins
+            delta[1] += losses
+            delta[2] += earned
+            delta[3] = max(delta[3], largest)
+
+    def _record_game(self, user_id, game, bet, payout, final_grid):
+        profit = max(0, payout - bet)
+        win = payout > bet
+        self._merge_stats(user_id, 1, 1 if win else 0, 0 if win else 1, profit, profit)
+        self._merge_symbols(user_id, final_grid)
+        if game == "blackjack":
+            self._merge_blackjack(user_id, 1 if win else 0, 1 if payout < bet else 0, profit, profit)
+        if win:
+            day, week = challenge_buckets()
+            for key in ((user_id, "day", day), (user_id, "week", week)):
+                self._challenges[key] = self._challenges.get(key, 0) + 1
+
+    async def get_balance(self, user_id):
+        if not self.write_behind:
+            return await self.run(get_balance, user_id)
+        return await self._load(int(user_id))
+
+    async def get_challenges(self, user_id):
+        """(daily wins, weekly wins). In write-behind mode unflushed wins are
+        added to what is on disk instead of forcing a flush."""
+        user_id = int(user_id)
+        if not self.write_behind:
+            return await self.run(get_challenges, user_id)
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        today = date.today()
+        day, week = challenge_buckets(today)
+        # As in get_profiles, the flush lock keeps pending wins in memory
+        # until the read has returned.
+        async with self._flush_lock:
+            daily, weekly = await self.run(get_challenges, user_id, today)
+            return (daily + self._challenges.get((user_id, "day", day), 0),
+                    weekly + self._challenges.get((user_id, "week", week), 0))
+
+    async def prune_challenges(self):
+        return await self.run(prune_challenges)
+
+    async def place_wager(self, user_id, game, bet):
+        if not self.write_behind:
+            balance = await self.run(place_wager, user_id, game, bet)
+            if balance is not None:
+                self._changed(user_id)
+            return balance
+        user_id = int(user_id)
+        if await self._load(user_id) < bet:
+            return None
+        return self._adjust(user_id, -bet, game, "wager")
+
+    async def settle_wager(self, user_id, game, bet, payout, final_grid=None):
+        if not self.write_behind:
+            self._changed(user_id)
+            return await self.run(settle_wager, user_id, game, bet, payout, final_grid)
+        user_id = int(user_id)
+        await self._load(user_id)
+        self._record_game(user_id, game, bet, payout, final_grid)
+        return self._adjust(user_id, payout, game, "payout")
+
+    async def top_balances(self, limit=5):
+        await self.flush()
+        return await self.run(top_balances, limit)
+
+    async def leaderboard_page(self, limit, after=None, before=None):
+        await self.flush()
+        return await self.run(leaderboard_page, limit, after, before)
+
+    async def get_rank(self, user_id):
+        """(position, balance), or (None, None) for a user with no balance
+        yet. Read-only, so looking someone up doesn't enrol them."""
+        await self.flush()
+        return await self.run(get_rank, int(user_id))
+
+    async def get_profiles(self, user_ids):
+        """Profiles for ``user_ids`` in PROFILE_COLUMNS order, keyed by user
+        id. In write-behind mode unflushed stat deltas and cached balances
+        are layered on top of what is on disk instead of forcing a flush.
+        The favourite symbol can trail by one flush interval."""
+        user_ids = [int(user_id) for user_id in user_ids]
+        if not self.write_behind:
+            return await self.run(get_profiles, user_ids)
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        # Holding the flush lock keeps a flush from moving deltas out of
+        # memory while they are not yet on disk.
+        async with self._flush_lock:
+            profiles = await self.run(get_profiles, user_ids)
+            for user_id in user_ids:
+                stats = self._stats.get(user_id)
+                profile = profiles.get(user_id)
+                if profile is None:
+                    if stats is None:
+                        continue
+                    profile = (0, 0, 0, 0, 0, 0, 0, 0, 0, STARTING_BALANCE, None)
+                profile = list(profile)
+                if stats is not None:
+                    for i in range(4):
+                        profile[i] += stats[i]
+                    profile[4] = max(profile[4], stats[4])
+                blackjack = self._blackjack.get(user_id)
+                if blackjack is not None:
+                    for i in range(3):
+                        profile[5 + i] += blackjack[i]
+                    profile[8] = max(profile[8], blackjack[3])
+                if user_id in self._balances:
+                    profile[9] = self._balances[user_id]
+                profiles[user_id] = tuple(profile)
+        return profiles
+
+    async def save_game(self, row, expires_at):
+        if not self.write_behind:
+            return await self.run(save_game, row, expires_at)
+        self._games[row[0]] = (row, expires_at)
+
+    async def delete_game(self, game_id):
+        if not self.write_behind:
+            return await self.run(delete_game, game_id)
+        self._games[game_id] = None
+
+    async def load_games(self):
+        await self.flush()
+        return await self.run(load_games)
+
+    async def get_setting(self, key):
+        return await self.run(get_setting, key)
+
+    async def set_setting(self, key, value):
+        await self.run(set_setting, key, value)
+
+    async def add_balance(self, user_id, amount):
+        if not self.write_behind:
+            self._changed(user_id)
+            return await self.run(add_balance, user_id, amount)
+        user_id = int(user_id)
+        await self._load(user_id)
+        return self._adjust(user_id, amount, "admin", "grant")
+
+    async def _run_batch(self, func, *args):
+        """Runs bulk_adjust or undo_batch and applies their changes to cached
+        balances."""
+        if not self.write_behind:
+            status, changes = await self.run(func, *args)
+        else:
+            if self._batch_lock is None:
+                self._batch_lock = asyncio.Lock()
+            async with self._batch_lock:
+                # Wagers and payouts wait in _load until the batch is applied,
+                # so the batch sees exactly the balances in the cache.
+                self._batch_idle.clear()
+                self._batches += 1
+                try:
+                    await self.flush()
+                    # Holding the flush lock until the cache has the changes
+                    # keeps a flush from writing pre-batch balances over them.
+                    async with self._flush_lock:
+                        status, changes = await self.run(func, *args)
+                        if status in ("applied", "undone"):
+                            for user_id, amount in changes:
+                                if user_id in self._balances:
+                                    self._balances[user_id] += amount
+                finally:
+                    self._batch_idle.set()
+        if status in ("applied", "undone"):
+            for user_id, _ in changes:
+                self._changed(user_id)
+        return status, len(changes), sum(amount for _, amount in changes)
+
+    async def bulk_adjust(self, action, amount, user_ids=None, target="", actor_id=None, dry_run=False):
+        """Returns (batch_id, status, users, total)."""
+        batch_id = uuid.uuid4().hex[:8]
+        if user_ids is not None:
+            user_ids = [int(user_id) for user_id in user_ids]
+        return (batch_id, *await self._run_batch(bulk_adjust, batch_id, action, amount, user_ids, target, actor_id, dry_run))
+
+    async def undo_batch(self, batch_id, actor_id=None):
+        """Returns (undo_id, status, users, total)."""
+        undo_id = uuid.uuid4().hex[:8]
+        return (undo_id, *await self._run_batch(undo_batch, batch_id, undo_id, actor_id))
+
+    async def claim_daily_reward(self, user_id, reward, today):
+        if not self.write_behind:
+            self._changed(user_id)
+            return await self.run(claim_daily_reward, user_id, reward, today)
+        user_id = int(user_id)
+        status, balance = await self.run(claim_daily_reward, user_id, 0, today)
+        if status == "new":
+            return status, balance
+        balance = await self._load(user_id)
+        if status == "claimed":
+            balance = self._adjust(user_id, reward, "daily", "reward")
+        return status, balance
@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+
+from blackjack_engine import (ACE, LOSE, PUSH, RANKS, WIN, Hand, Shoe, basic_strategy_hits, dealer_play, play_hand,
+                              settle)
+from blackjack_sim import simulate
+
+
+def hand(*labels):
+    return Hand(RANKS.index(label) for label in labels)
+
+
+def test_aces_drop_to_one_only_when_they_must():
+    assert (hand("A", "6").value, hand("A", "6").soft) == (17, True)
+    assert (hand("A", "6", "10").value, hand("A", "6", "10").soft) == (17, False)
+    assert hand("A", "A", "A", "8").value == 21
+    assert hand("K", "Q", "5").busted
+    assert hand("A", "K").labels() == ["A", "K"]
+
+
+def test_settle():
+    assert settle(hand("10", "9"), hand("10", "8")) == WIN
+    assert settle(hand("10", "8"), hand("10", "8")) == PUSH
+    assert settle(hand("10", "7"), hand("10", "8")) == LOSE
+    assert settle(hand("10", "6"), hand("10", "6", "K")) == WIN
+    # A busted player loses even when the dealer busts too.
+    assert settle(hand("10", "6", "K"), hand("10", "6", "K")) == LOSE
+
+
+def test_basic_strategy_samples():
+    assert basic_strategy_hits(hand("10", "2"), RANKS.index("3"))
+    assert not basic_strategy_hits(hand("10", "2"), RANKS.index("5"))
+    assert basic_strategy_hits(hand("10", "6"), RANKS.index("7"))
+    assert not basic_strategy_hits(hand("10", "6"), RANKS.index("6"))
+    assert basic_strategy_hits(hand("A", "7"), RANKS.index("9"))
+    assert not basic_strategy_hits(hand("A", "7"), RANKS.index("8"))
+    assert not basic_strategy_hits(hand("10", "7"), ACE)
+
+
+def test_dealer_stands_on_seventeen():
+    shoe = Shoe(decks=1, rng=random.Random(3))
+    for _ in range(200):
+        dealer = Hand([shoe.draw(), shoe.draw()])
+        dealer_play(dealer, shoe)
+        assert dealer.value >= 17
+
+
+def test_shoe_holds_every_card_and_reshuffles_at_the_cut():
+    shoe = Shoe(decks=2, penetration=0.5, rng=random.Random(1))
+    assert Counter(shoe.cards) == {rank: 8 for rank in range(len(RANKS))}
+    assert shoe.shuffles == 1
+    for _ in range(shoe.cut):
+        shoe.draw()
+    assert shoe.shuffles == 1
+    shoe.start_round()
+    assert shoe.shuffles == 2 and shoe.position == 0
+
+
+def test_simulation_is_seeded_and_near_the_expected_edge():
+    counts, shuffles = simulate(20_000, 6, 0.75, 10)
+    assert (counts, shuffles) == simulate(20_000, 6, 0.75, 10)
+    assert sum(counts.values()) == 20_000 and shuffles > 1
+    # Hit/stand basic strategy with no doubles or splits loses a few percent.
+    edge = (counts[WIN] - counts[LOSE]) / 20_000
+    assert -0.12 < edge < 0.02
+    assert play_hand(Shoe(rng=random.Random(0))) in (WIN, PUSH, LOSE)
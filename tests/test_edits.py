@@ -0,0 +1,71 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from edits import EditScheduler
+
+
+class Message:
+    def __init__(self, message_id, sent):
+        self.id = message_id
+        self.channel = SimpleNamespace(id=1)
+        self.sent = sent
+
+    async def edit(self, **fields):
+        self.sent.append(time.monotonic())
+        return self
+
+
+def test_no_window_holds_more_than_rate_edits():
+    async def main():
+        sent = []
+        edits = EditScheduler(rate=5, per=0.5)
+        messages = [Message(i, sent) for i in range(4)]
+        deadline = time.monotonic() + 1.6
+        while time.monotonic() < deadline:
+            for message in messages:
+                edits.submit(message, content="frame")
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*(edits.edit(message, content="done") for message in messages))
+        return sent, edits
+
+    sent, edits = asyncio.run(main())
+    for i, started in enumerate(sent):
+        assert len([t for t in sent[i:] if t - started < 0.5]) <= 5
+    assert edits.frames_dropped > 0
+
+
+class Broken(Message):
+    async def edit(self, **fields):
+        raise OSError("connection reset")
+
+
+def test_failed_edit_reaches_its_waiter_and_the_queue_keeps_draining():
+    async def main():
+        sent = []
+        edits = EditScheduler(rate=5, per=0.5)
+        broken, fine = Broken(1, sent), Message(2, sent)
+        results = await asyncio.wait_for(asyncio.gather(edits.edit(broken, content="x"), edits.edit(fine, content="y"),
+                                                        return_exceptions=True), 1)
+        # A later edit on the same channel still gets a worker.
+        again = await asyncio.wait_for(edits.edit(fine, content="z"), 1)
+        return results, again, edits
+
+    (failed, sent), again, edits = asyncio.run(main())
+    assert isinstance(failed, OSError)
+    assert sent.id == again.id == 2
+    assert edits.queue_depth == 0
+
+
+def test_cancelled_worker_cancels_waiting_edits():
+    async def main():
+        edits = EditScheduler(rate=1, per=60)
+        messages = [Message(i, []) for i in range(2)]
+        first = asyncio.ensure_future(edits.edit(messages[0], content="a"))
+        second = asyncio.ensure_future(edits.edit(messages[1], content="b"))
+        await first
+        edits._workers[1].cancel()
+        return await asyncio.wait_for(asyncio.gather(second, return_exceptions=True), 1)
+
+    result, = asyncio.run(main())
+    assert isinstance(result, asyncio.CancelledError)
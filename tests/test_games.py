@@ -0,0 +1,35 @@
+from blackjack_engine import Hand
+from games import BlackjackGame, GameRegistry, SlotGame, game_from_row, game_to_row, new_game_id
+
+
+def test_games_survive_a_round_trip_through_their_row():
+    slot = SlotGame(new_game_id(), 1, 50, "deluxe", channel_id=2, message_id=3)
+    restored = game_from_row(*game_to_row(slot))
+    assert (restored.kind, restored.bet, restored.machine, restored.message_id) == ("slots", 50, "deluxe", 3)
+
+    hand = BlackjackGame("b1", 1, 20, Hand([12, 5]), Hand([9]))
+    restored = game_from_row(*game_to_row(hand))
+    assert (restored.player.value, restored.player.soft, restored.dealer.cards) == (18, True, [9])
+
+
+def test_lookups_push_expiry_out_and_expire_pops_idle_games():
+    games = GameRegistry(ttl=120)
+    old, fresh = SlotGame("old", 1, 10), SlotGame("fresh", 2, 10)
+    games.add(old, expires_at=1000)
+    games.add(fresh, expires_at=5000)
+    assert games.expire(now=2000) == [old]
+    assert "old" not in games and len(games) == 1
+
+    assert games.get("fresh") is fresh
+    assert games.expires_at("fresh") > 5000
+    assert games.get("missing") is None
+    assert games.pop("fresh") is fresh and games.pop("fresh") is None
+
+
+def test_expire_drops_least_recently_used_games_over_the_cap():
+    games = GameRegistry(ttl=120, max_size=2)
+    for game_id in "abc":
+        games.add(SlotGame(game_id, 1, 10))
+    games.get("a")
+    assert [game.game_id for game in games.expire()] == ["b"]
+    assert sorted(game.game_id for game in games.values()) == ["a", "c"]
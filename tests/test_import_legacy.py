@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from import_legacy import iter_members
+
+DOCUMENT = {
+    "101": 12.25,
+    "102": 1e5,
+    "103": -7.5E-3,
+    "104": 250,
+    "105": {"balance": 99.5, "note": "🍒 x3"},
+    "106": {"games_played": 12, "wins": 5, "most_common_symbol": "{\"💎\": 4}"},
+    "107": [1.5, 2, 3e2],
+    "108": True,
+    "109": None,
+    "110": "🤡",
+    "111": 123456789012345678,
+}
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "bom"])
+def document(request, tmp_path):
+    path = tmp_path / "data.json"
+    text = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+    path.write_bytes(("﻿" if request.param else "").encode() + text.encode())
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", list(range(1, 41)) + [64, 1 << 16])
+def test_members_match_json_load_at_every_chunk_size(document, chunk_size):
+    members = [(key, value) for key, value, _ in iter_members(document, chunk_size=chunk_size)]
+    assert members == list(json.loads(document.read_text(encoding="utf-8-sig")).items())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 9, 64])
+def test_resuming_from_any_offset_yields_the_rest(document, chunk_size):
+    members = list(iter_members(document, chunk_size=chunk_size))
+    for i, (_, _, offset) in enumerate(members):
+        rest = [(key, value) for key, value, _ in iter_members(document, offset, chunk_size)]
+        assert rest == [(key, value) for key, value, _ in members[i + 1:]]
+
+
+def test_large_float_file_spanning_many_chunks(tmp_path):
+    path = tmp_path / "currency_data.json"
+    document = {str(10**17 + i): 123.45 + i for i in range(200_000)}
+    path.write_text(json.dumps(document))
+    assert dict((key, value) for key, value, _ in iter_members(path)) == document
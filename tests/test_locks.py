@@ -0,0 +1,25 @@
+import pytest
+
+from locks import UserLocks
+
+
+def test_second_claim_is_refused_until_the_first_is_released():
+    locks = UserLocks()
+    with locks.claim(1) as first:
+        assert first and locks.busy(1)
+        with locks.claim(1) as second:
+            assert not second
+        assert locks.busy(1)
+        with locks.claim(2) as other:
+            assert other
+    assert not locks.busy(1) and len(locks) == 0
+    assert locks.stats() == {"in_flight": 0, "claimed": 2, "contended": 1}
+
+
+def test_claim_is_released_when_the_action_raises():
+    locks = UserLocks()
+    with pytest.raises(RuntimeError):
+        with locks.claim(1):
+            raise RuntimeError
+    with locks.claim(1) as claimed:
+        assert claimed
@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from migrations import MIGRATIONS, migrate
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_fresh_database_reaches_the_latest_version_once(tmp_path):
+    conn = sqlite3.connect(tmp_path / "bot.db")
+    assert migrate(conn) == LATEST
+    assert {"currency", "ledger", "symbol_counts", "games", "ledger_daily"} <= tables(conn)
+    assert migrate(conn) == LATEST
+    assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_legacy_database_keeps_its_rows(tmp_path):
+    conn = sqlite3.connect(tmp_path / "currency.db")
+    # The schema init_db.py used to create, plus the column daily_reward
+    # used to add on the fly.
+    conn.execute("CREATE TABLE currency (user_id INTEGER PRIMARY KEY, balance INTEGER DEFAULT 100, last_claim_date TEXT)")
+    conn.execute("""CREATE TABLE stats (user_id INTEGER PRIMARY KEY, games_played INTEGER DEFAULT 0, wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0, total_earned INTEGER DEFAULT 0, most_common_symbol TEXT DEFAULT '{}', largest_win INTEGER DEFAULT 0)""")
+    conn.execute("INSERT INTO currency VALUES (1, 250, '2026-01-01')")
+    conn.commit()
+
+    assert migrate(conn) == LATEST
+    assert conn.execute("SELECT balance, last_claim_date FROM currency WHERE user_id = 1").fetchone() == (250, "2026-01-01")
+    assert "last_weekly_reset" in migrations.columns(conn.cursor(), "challenges")
+
+
+def test_failed_migration_rolls_back_the_whole_run(tmp_path, monkeypatch):
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("boom")
+
+    conn = sqlite3.connect(tmp_path / "bot.db")
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS[:3] + [(4, "broken", broken)])
+    with pytest.raises(RuntimeError):
+        migrate(conn)
+    assert "currency" not in tables(conn) and "half_done" not in tables(conn)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS)
+    assert migrate(conn) == LATEST
@@ -0,0 +1,47 @@
+from profiles import ProfileCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def render(cache, user_id, embed):
+    cache.begin(user_id)
+    cache.finish(user_id, embed)
+
+
+def test_embeds_expire_after_ttl_and_on_invalidate():
+    clock = Clock()
+    cache = ProfileCache(ttl=10, clock=clock)
+    render(cache, 1, "embed")
+    assert cache.get(1) == "embed"
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    render(cache, 1, "embed")
+    clock.now = 10
+    assert cache.get(1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_render_in_flight_during_a_change_is_not_stored():
+    cache = ProfileCache()
+    cache.begin(1)
+    cache.invalidate(1)
+    cache.finish(1, "stale")
+    assert cache.get(1) is None
+    render(cache, 1, "fresh")
+    assert cache.get(1) == "fresh"
+
+
+def test_least_recently_used_embed_is_dropped_over_the_cap():
+    cache = ProfileCache(max_size=2)
+    render(cache, 1, "one")
+    render(cache, 2, "two")
+    cache.get(1)
+    render(cache, 3, "three")
+    assert (cache.get(1), cache.get(2), cache.get(3)) == ("one", None, "three")
+    assert len(cache) == 2
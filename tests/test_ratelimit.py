@@ -0,0 +1,46 @@
+import pytest
+
+from ratelimit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_user_bucket_refills_at_the_configured_rate():
+    clock = Clock()
+    limiter = RateLimiter(rate=2, per=10.0, clock=clock)
+    assert limiter.hit(1) == 0 and limiter.hit(1) == 0
+    assert limiter.hit(1) == pytest.approx(5.0)
+    assert limiter.hit(2) == 0
+    clock.now += 5
+    assert limiter.hit(1) == 0
+    assert limiter.hit(1) > 0
+    assert limiter.stats()["rejected_user"] == 2
+
+
+def test_guild_bucket_caps_a_whole_server_without_spending_user_tokens():
+    clock = Clock()
+    limiter = RateLimiter(rate=5, per=10.0, guild_rate=3, guild_per=10.0, clock=clock)
+    assert [limiter.hit(user, guild_id=9) for user in range(3)] == [0, 0, 0]
+    assert limiter.hit(3, guild_id=9) == pytest.approx(10 / 3)
+    assert 3 not in limiter.users
+    assert limiter.hit(3, guild_id=10) == 0
+    assert limiter.hit(3) == 0
+    assert limiter.stats()["rejected_guild"] == 1
+
+
+def test_eviction_only_drops_full_buckets():
+    clock = Clock()
+    limiter = RateLimiter(rate=2, per=10.0, guild_per=20.0, clock=clock)
+    limiter.hit(1, guild_id=9)
+    clock.now += 10
+    limiter.hit(2)
+    assert limiter.evict() == 1
+    assert set(limiter.users) == {2} and set(limiter.guilds) == {9}
+    # An evicted user is treated exactly like one never seen.
+    assert limiter.hit(1) == 0 and limiter.hit(1) == 0 and limiter.hit(1) > 0
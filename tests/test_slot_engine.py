@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from slot_engine import MACHINES, SlotMachine, across, deluxe_payouts, payouts, split_symbols
+
+
+def grid_of(machine, rows):
+    return [machine.symbols.index(symbol) for row in rows for symbol in row]
+
+
+def naive_multiplier(machine, paytable, grid):
+    """Pays every line by building its string, as the original game did."""
+    rendered = machine.render(grid)
+    total = 0
+    for line in machine.paylines:
+        text = "".join(rendered[row][reel] for row, reel in line)
+        best = max((multiplier for key, multiplier in paytable.items() if text.startswith(key)), default=0)
+        if best and not machine.sum_lines:
+            return best
+        total += best
+    return total
+
+
+def test_split_symbols_handles_multi_codepoint_symbols():
+    assert split_symbols("⭐⭐💎", ["⭐", "💎"]) == ["⭐", "⭐", "💎"]
+    assert split_symbols(("a", "b"), ["a", "b"]) == ["a", "b"]
+    with pytest.raises(ValueError):
+        split_symbols("🍒x", ["🍒"])
+
+
+def test_classic_pays_a_line_and_nothing_else():
+    machine = MACHINES["classic"]
+    win = grid_of(machine, [["🍉", "🍉", "🍉"], ["🍒", "🤡", "🔔"], ["⭐", "💎", "🤡"]])
+    lose = grid_of(machine, [["🍉", "🍒", "🍉"], ["🍒", "🤡", "🔔"], ["⭐", "💎", "🤡"]])
+    assert machine.evaluate(win) == (10, [0])
+    assert machine.payout(win, 7) == 70
+    assert machine.payout(lose, 7) == 0
+
+
+def test_deluxe_sums_the_longest_match_on_every_line():
+    machine = MACHINES["deluxe"]
+    grid = grid_of(machine, [
+        ["🍒", "🍒", "🍒", "🍒", "🤡"],
+        ["🔔", "🔔", "🔔", "🤡", "🍉"],
+        ["💎", "🍉", "⭐", "⭐", "🤡"],
+    ])
+    # Middle row pays three bells, the top row four cherries.
+    assert machine.evaluate(grid) == (8 + 5, [0, 1])
+
+
+@pytest.mark.parametrize("name", sorted(MACHINES))
+def test_matches_the_string_evaluator(name):
+    machine = MACHINES[name]
+    paytable = {"classic": payouts, "deluxe": deluxe_payouts}[name]
+    rng = random.Random(8)
+    for _ in range(20_000):
+        grid = machine.spin(rng)
+        assert machine.evaluate(grid)[0] == naive_multiplier(machine, paytable, grid)
+
+
+def test_spin_and_render_shapes():
+    machine = SlotMachine("tiny", ["a", "b"], {"a": 1, "b": 0}, {"aa": 3}, [across(0, 0)], rows=2, reels=2)
+    grid = machine.spin(random.Random(1))
+    assert grid == [0, 0, 0, 0]
+    assert machine.render(grid) == [["a", "a"], ["a", "a"]]
+    assert machine.payout(grid, 2) == 6
+    assert machine.random_symbol() == "a"
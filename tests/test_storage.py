@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sqlite3
+
+from storage import Database
+
+
+def run(path, scenario, **options):
+    async def main():
+        db = Database(str(path), **options)
+        db.migrate()
+        db.start()
+        try:
+            return await scenario(db)
+        finally:
+            await db.close()
+    return asyncio.run(main())
+
+
+def ledger_mismatches(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute("""
+            SELECT COUNT(*) FROM currency c
+            WHERE balance != 100 + COALESCE((SELECT SUM(amount) FROM ledger l WHERE l.user_id = c.user_id), 0)
+        """).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_deduct_racing_a_cached_wager_stops_at_zero(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario(db):
+        await db.get_balance(1)
+        batch = asyncio.create_task(db.bulk_adjust("deduct", 100, [1]))
+        await asyncio.sleep(0)
+        wager = await db.place_wager(1, "slots", 60)
+        return wager, await batch, await db.get_balance(1)
+
+    wager, (_, status, users, total), balance = run(path, scenario)
+    assert status == "applied" and users == 1 and total == -100
+    assert wager is None
+    assert balance == 0
+    assert ledger_mismatches(path) == 0
+
+
+def test_deduct_racing_an_uncached_load_uses_fresh_balance(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario(db):
+        await db.get_balance(1)
+        db._balances.clear()
+        wager = asyncio.create_task(db.place_wager(1, "slots", 60))
+        await asyncio.sleep(0)
+        batch = await db.bulk_adjust("deduct", 70, [1])
+        return await wager, batch, await db.get_balance(1)
+
+    wager, (_, _, _, total), balance = run(path, scenario)
+    assert total == -70
+    assert wager is None
+    assert balance == 30
+    assert ledger_mismatches(path) == 0
+
+
+def test_undo_racing_a_wager_stops_at_zero(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario(db):
+        batch_id, *_ = await db.bulk_adjust("grant", 50, [1])
+        await db.get_balance(1)
+        undo = asyncio.create_task(db.undo_batch(batch_id))
+        await asyncio.sleep(0)
+        wager = await db.place_wager(1, "slots", 120)
+        return wager, await undo, await db.get_balance(1)
+
+    wager, (_, status, _, total), balance = run(path, scenario)
+    assert status == "undone" and total == -50
+    assert wager is None
+    assert balance == 100
+    assert ledger_mismatches(path) == 0
+
+
+def test_background_queries_do_not_hold_off_maintenance(tmp_path):
+    async def main(note_activity):
+        db = Database(str(tmp_path / f"bot-{note_activity}.db"), quiet_period=0.2)
+        db.maintenance_interval = 0.05
+        db.migrate()
+        db.start()
+        try:
+            deadline = asyncio.get_running_loop().time() + 0.8
+            while asyncio.get_running_loop().time() < deadline:
+                await db.top_balances()
+                if note_activity:
+                    db.note_activity()
+                await asyncio.sleep(0.05)
+            return db.maintenance_runs
+        finally:
+            await db.close()
+
+    assert asyncio.run(main(False)) > 0
+    assert asyncio.run(main(True)) == 0
+
+
+def test_rank_lookup_does_not_create_a_balance(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario(db):
+        await db.place_wager(1, "slots", 10)
+        return await db.get_rank(2), await db.get_rank(1), await db.top_balances()
+
+    missing, ranked, top = run(path, scenario)
+    assert missing == (None, None)
+    assert ranked == (1, 90)
+    assert top == [(1, 90)]
+
+
+def test_challenges_include_unflushed_wins_without_flushing(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario(db):
+        for payout in (20, 0, 20):
+            await db.place_wager(1, "slots", 10)
+            await db.settle_wager(1, "slots", 10, payout)
+        await db.flush()
+        await db.place_wager(1, "slots", 10)
+        await db.settle_wager(1, "slots", 10, 20)
+        flushes = db.flushes
+        return await db.get_challenges(1), db.flushes - flushes
+
+    challenges, flushes = run(path, scenario, flush_interval=60)
+    assert challenges == (3, 3)
+    assert flushes == 0